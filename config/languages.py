@@ -49,6 +49,7 @@ TEXTS = {
     "input_question_placeholder": "请输入您要咨询的问题...",
     "input_divination_label": "起卦方式",
     "input_model_label": "模型选择",
+    "input_advanced_options": "高级选项",
     
     # 标签页标题
     "tab_hexagram": "卦象信息",
@@ -112,6 +113,7 @@ TEXTS = {
     "history_detail_placeholder": "请选择一条历史记录查看详情...",
     "history_stats_total": "总记录数:",
     "history_stats_showing": "显示记录数:",
+    "history_stats_loading": "正在加载历史记录...",
     "history_export_btn": "导出记录",
     "history_delete_btn": "删除记录",
     "history_clear_btn": "清空所有",
@@ -166,5 +168,5 @@ def get_text(key: str) -> str:
 
 # 兼容性函数（保持与原有代码的兼容性）
 def t(key: str) -> str:
-    """翻译文本的便捷函数"""
-    return get_text(key)
\ No newline at end of file
+    """翻译文本的便捷函数（直接查表，与get_text等价）"""
+    return TEXTS.get(key, key)
\ No newline at end of file
@@ -85,9 +85,8 @@ def toggle_theme_mode():
     current_mode = UI_SETTINGS["appearance_mode"]
     new_mode = "dark" if current_mode == "light" else "light"
     
-    # 保存新的主题模式到配置文件
+    # 记录新的主题模式，退出时统一写入配置文件
     config_manager.set_theme_mode(new_mode)
-    config_manager.save_config()
     
     return update_ui_settings({"appearance_mode": new_mode})
 
@@ -1,9 +1,15 @@
 # gui/app.py
 
+import asyncio
 import importlib.util
+import logging
 import os
+import queue
+import re
 import threading
 import tkinter as tk
+from concurrent.futures import Future
+from string import Template
 
 import customtkinter as ctk
 
@@ -25,6 +31,87 @@ from .frames import (
 # 设置日志记录器
 logger = setup_logger(__name__)
 
+# AI() 返回的错误信息前缀
+_ERROR_PREFIXES = ("API请求失败", "API响应解析失败", "处理失败")
+
+# 后台线程等待主线程读取控件内容的最长时间（秒）
+_MAIN_THREAD_CALL_TIMEOUT = 30
+
+# 聊天上下文中需要提取的分析部分
+_CHAT_CONTEXT_SECTIONS = ("【用神判断】", "【用神卦理分析】", "【动爻卦理分析】", "【数字量化分析】")
+
+# 解读结果中所有分析部分的标题，相邻标题之间即为一个部分的内容
+_SECTION_RE = re.compile(r'【(?:用神判断|用神卦理分析|动爻卦理分析|数字量化分析|方面分析|综合解读|总结论)】')
+
+# 聊天提示词模板，每条消息只替换可变部分
+_CHAT_PROMPT_TEMPLATE = Template("""$base
+
+【前期分析结果】
+$analysis
+【完整解读结果】
+$full
+【参考文件】
+$rag
+【用户问题】
+$msg
+
+请基于上述解读结果和参考资料，针对用户的具体问题给出专业解答。解答中不要出现参考文件的序号及文件名。""")
+
+
+def _build_analysis_context(current_result):
+    """从解读结果中提取聊天所需的各分析部分，拼接为上下文"""
+    # 提取各个分析部分的内容（单次扫描所有标题，按相邻标题位置切分）
+    analysis_sections = {}
+    headings = [(m.group(), m.start()) for m in _SECTION_RE.finditer(current_result)]
+    for idx, (heading, start_idx) in enumerate(headings):
+        if heading not in _CHAT_CONTEXT_SECTIONS or heading in analysis_sections:
+            continue
+        end_idx = headings[idx + 1][1] if idx + 1 < len(headings) else len(current_result)
+        analysis_sections[heading] = current_result[start_idx:end_idx].strip()
+
+    # 构建包含分析部分的聊天提示词
+    return "".join(f"{content}\n\n" for content in analysis_sections.values() if content)
+
+
+def first_successful(*calls):
+    """在守护线程中并发执行多个AI调用，返回最先成功的结果
+    
+    AI() 以 "API请求失败" 等前缀的字符串表示失败，此类结果与异常一样
+    视为失败；全部失败时返回最后一个失败结果（或抛出最后一个异常）。
+    得到成功结果后立即返回，不等待其余仍在运行的调用；守护线程不会阻塞程序退出，
+    落后调用的结果直接丢弃。
+    
+    Args:
+        *calls: 无参数的可调用对象
+    """
+    if not calls:
+        raise ValueError("first_successful至少需要一个调用")
+    
+    results = queue.Queue()
+    
+    def run(call):
+        try:
+            results.put((True, call()))
+        except Exception as e:
+            results.put((False, e))
+    
+    for call in calls:
+        threading.Thread(target=run, args=(call,), name="race", daemon=True).start()
+    
+    last_result = None
+    last_error = None
+    for _ in calls:
+        ok, value = results.get()
+        if not ok:
+            last_error = value
+        elif isinstance(value, str) and value.startswith(_ERROR_PREFIXES):
+            last_result = value
+        else:
+            return value
+    if last_result is not None:
+        return last_result
+    raise last_error
+
 class SixYaoApp(ctk.CTk):
     """主应用程序类，使用customtkinter实现iOS风格界面"""
     
@@ -79,6 +166,27 @@ class SixYaoApp(ctk.CTk):
         # 初始化RAG检索器（将在后台初始化）
         self.rag_searcher = None
         
+        # 备用模型：生成结论时与主模型并发请求，取最先成功的结果
+        self._backup_model = config_manager.get('backup_model')
+        
+        # 动态加载的api/prompts模块缓存，避免每次分析或聊天都重新读取、编译文件
+        self._api_module = None
+        self._prompts_module = None
+        
+        # 后台线程提交的UI更新队列：队列由空变为非空时安排一次空闲回调统一执行，空闲时不轮询
+        self._ui_queue = queue.Queue()
+        self._ui_drain_job = None
+        self._ui_drain_lock = threading.Lock()
+        
+        # 聊天请求由一个常驻守护线程从队列中依次处理，避免每条消息创建新线程；
+        # 守护线程不会在退出时被等待，关闭窗口时不必等正在进行的请求返回
+        self._destroyed = False
+        self._chat_queue = queue.Queue()
+        threading.Thread(target=self._chat_worker, name="chat", daemon=True).start()
+        
+        # 聊天消息写入历史记录时延迟合并保存，避免每条回复都完整写盘
+        self._history_save_job = None
+        
         # 创建UI组件
         self.create_widgets()
         
@@ -188,7 +296,7 @@ class SixYaoApp(ctk.CTk):
             
             # 显示数据库状态提示
             if self.database_built:
-                self.after(500, lambda: self.show_database_status("RAG数据库已更新，解卦准确性已提升"))
+                self.update_ui(lambda: self.after(500, lambda: self.show_database_status("RAG数据库已更新，解卦准确性已提升")))
             
         except Exception as e:
             logger.error(f"后台初始化失败: {str(e)}")
@@ -229,17 +337,14 @@ class SixYaoApp(ctk.CTk):
                 self.status_frame.update_status(status)
                 self.status_frame.update_progress(progress / 100.0)
         
-        self.after(0, update_ui)
+        self.update_ui(update_ui)
     
     def disable_ui_during_initialization(self):
         """初始化期间禁用UI功能"""
         def disable_ui():
             if hasattr(self, 'input_frame'):
-                # 禁用输入框架的按钮
-                if hasattr(self.input_frame, 'analyze_button'):
-                    self.input_frame.analyze_button.configure(state="disabled")
-                if hasattr(self.input_frame, 'clear_button'):
-                    self.input_frame.clear_button.configure(state="disabled")
+                # 禁用输入框架的按钮（经由set_buttons_state，回车触发分析时依赖其缓存的状态）
+                self.input_frame.set_buttons_state("disabled")
         
         self.after(100, disable_ui)
     
@@ -248,16 +353,13 @@ class SixYaoApp(ctk.CTk):
         def enable_ui():
             if hasattr(self, 'input_frame'):
                 # 启用输入框架的按钮
-                if hasattr(self.input_frame, 'analyze_button'):
-                    self.input_frame.analyze_button.configure(state="normal")
-                if hasattr(self.input_frame, 'clear_button'):
-                    self.input_frame.clear_button.configure(state="normal")
+                self.input_frame.set_buttons_state("normal")
             
             # 重置状态栏
             if hasattr(self, 'status_frame'):
                 self.status_frame.reset()
         
-        self.after(0, enable_ui)
+        self.update_ui(enable_ui)
     
     def center_window(self):
         """将窗口居中显示"""
@@ -283,7 +385,11 @@ class SixYaoApp(ctk.CTk):
         self.input_frame.grid(row=1, column=0, sticky="ew", padx=20, pady=(10, 15))
         
         # 3. 笔记本区域 - 卦象信息、解读结果和对话
-        self.notebook_frame = NotebookFrame(self, on_tab_changed=self.on_tab_changed)
+        self.notebook_frame = NotebookFrame(
+            self,
+            on_tab_changed=self.on_tab_changed,
+            on_chat_message=self.handle_chat_message
+        )
         self.notebook_frame.grid(row=2, column=0, sticky="nsew", padx=20, pady=(15, 15))
         
         # 4. 状态区域 - 进度条和状态文本
@@ -429,14 +535,8 @@ class SixYaoApp(ctk.CTk):
             duration = 50  # 毫秒 - 大幅减少动画时长
             
             # 同时显示所有组件，不使用延迟，减少闪烁
-            self.update_idletasks()  # 先更新布局
-            
-            # 一次性显示所有组件
-            self.header_frame.update_idletasks()
-            self.input_frame.update_idletasks()
-            self.notebook_frame.update_idletasks()
-            self.status_frame.update_idletasks()
-            self.footer_frame.update_idletasks()
+            # update_idletasks处理整个应用的空闲任务，一次即可完成所有组件的布局
+            self.update_idletasks()
             
             logger.info("应用启动动画效果完成 - 高性能模式")
         except Exception as e:
@@ -494,8 +594,9 @@ class SixYaoApp(ctk.CTk):
         # 禁用按钮，防止重复提交
         self.input_frame.set_buttons_state("disabled")
         
-        # 清空之前的结果
+        # 清空之前的结果，并在分析期间保持结果文本框可编辑，逐段插入时不必反复切换状态
         self.notebook_frame.clear_result()
+        self.notebook_frame.begin_streaming()
         
         # 更新状态
         self.status_frame.update_status("分析中...")
@@ -514,22 +615,11 @@ class SixYaoApp(ctk.CTk):
     def perform_analysis(self, question, hexagram_content, divination_method, model, yongshen, fangmian):
         """执行分析过程"""
         try:
-            # 导入API模块
-            import sys
-            import os
-            import importlib.util
-            
-            # 获取项目根目录
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            api_file_path = os.path.join(project_root, 'api.py')
-            
             # 使用已初始化的RAG检索器
             rag_references = set()  # 用于收集参考文件名
             
-            # 动态导入api.py模块
-            spec = importlib.util.spec_from_file_location("api_module", api_file_path)
-            api_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(api_module)
+            # 导入API模块（首次加载后缓存）
+            api_module = self._get_api_module()
             
             AI = api_module.AI
             parse_ai_response = api_module.parse_ai_response
@@ -542,11 +632,8 @@ class SixYaoApp(ctk.CTk):
             
             self.update_ui(update_initial_status)
             
-            # 导入提示词模块
-            prompts_file_path = os.path.join(project_root, 'src', 'prompts.py')
-            prompts_spec = importlib.util.spec_from_file_location("prompts_module", prompts_file_path)
-            prompts_module = importlib.util.module_from_spec(prompts_spec)
-            prompts_spec.loader.exec_module(prompts_module)
+            # 导入提示词模块（首次加载后缓存）
+            prompts_module = self._get_prompts_module()
             
             # 根据起卦方式选择提示词模板
             if divination_method == "六爻占卜":
@@ -650,7 +737,7 @@ class SixYaoApp(ctk.CTk):
                         yongshen_response = AI(yongshen_input, model, yongshen_prompt)
 
                         # 检查是否是错误信息
-                        if not yongshen_response.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                        if not yongshen_response.startswith(_ERROR_PREFIXES):
                             try:
                                 # 解析用神判断结果
                                 import json
@@ -722,7 +809,7 @@ class SixYaoApp(ctk.CTk):
                     guli_response = AI(guli_input, model, guli_prompt)
                     logger.info(guli_response)
                     # 检查是否是错误信息
-                    if not guli_response.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                    if not guli_response.startswith(_ERROR_PREFIXES):
                         try:
                             # 解析用神卦理分析结果
                             import json
@@ -730,14 +817,15 @@ class SixYaoApp(ctk.CTk):
 
                             # 插入用神卦理分析结果到解读结果编辑框
                             def insert_guli_result():
-                                self.notebook_frame.insert_result("【用神卦理分析】\n", 'aspect_title')
-                                self.notebook_frame.insert_result(f"月建关系：{guli_result.get('月建关系', '未知')}\n")
-                                self.notebook_frame.insert_result(f"日辰关系：{guli_result.get('日辰关系', '未知')}\n")
-                                self.notebook_frame.insert_result(f"动爻关系：{guli_result.get('动爻关系', '未知')}\n")
-                                self.notebook_frame.insert_result(f"特殊状态：{guli_result.get('特殊状态', '未知')}\n")
-                                self.notebook_frame.insert_result(f"回头生克：{guli_result.get('回头生克', '未知')}\n")
-                                self.notebook_frame.insert_result(f"原神忌神：{guli_result.get('原神忌神', '未知')}\n")
-                                self.notebook_frame.insert_result(f"旺衰评估：{guli_result.get('旺衰评估', '未知')}\n\n")
+                                with self.notebook_frame.batched_inserts():
+                                    self.notebook_frame.insert_result("【用神卦理分析】\n", 'aspect_title')
+                                    self.notebook_frame.insert_result(f"月建关系：{guli_result.get('月建关系', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"日辰关系：{guli_result.get('日辰关系', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"动爻关系：{guli_result.get('动爻关系', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"特殊状态：{guli_result.get('特殊状态', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"回头生克：{guli_result.get('回头生克', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"原神忌神：{guli_result.get('原神忌神', '未知')}\n")
+                                    self.notebook_frame.insert_result(f"旺衰评估：{guli_result.get('旺衰评估', '未知')}\n\n")
 
                             self.update_ui(insert_guli_result)
                             logger.info("用神卦理分析完成")
@@ -787,47 +875,49 @@ class SixYaoApp(ctk.CTk):
 
                     # 调用AI进行动爻卦理分析
                     dongyao_response = AI(dongyao_input, model, dongyao_prompt).replace("json", "").replace("```", "")
-                    logger.info(dongyao_response)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(dongyao_response)
                     # 检查是否是错误信息
-                    if not dongyao_response.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                    if not dongyao_response.startswith(_ERROR_PREFIXES):
                         try:
-                            logger.info(dongyao_response)
                             # 解析动爻卦理分析结果
                             import json
                             dongyao_result = json.loads(dongyao_response)
-                            logger.info(dongyao_response)
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("有动爻: %s, 动爻列表: %s",
+                                             dongyao_result.get('有动爻', False),
+                                             dongyao_result.get('动爻列表', []))
 
                             # 插入动爻卦理分析结果到解读结果编辑框
                             def insert_dongyao_result():
-                                self.notebook_frame.insert_result("【动爻卦理分析】\n", 'aspect_title')
-
-                                has_dongyao = dongyao_result.get('有动爻', False)
-                                logger.info(has_dongyao)
-                                if has_dongyao:
-                                    dongyao_list = dongyao_result.get('动爻列表', [])
-                                    logger.info(dongyao_list)
-                                    if dongyao_list:
-                                        for i, dongyao in enumerate(dongyao_list, 1):
-                                            self.notebook_frame.insert_result(
-                                                f"动爻{i}（{dongyao.get('爻位', '未知')}）：\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  月建关系：{dongyao.get('月建关系', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  日辰关系：{dongyao.get('日辰关系', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  动爻关系：{dongyao.get('动爻关系', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  特殊状态：{dongyao.get('特殊状态', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  回头生克：{dongyao.get('回头生克', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  变爻关系：{dongyao.get('变爻关系', '未知')}\n")
-                                            self.notebook_frame.insert_result(
-                                                f"  旺衰评估：{dongyao.get('旺衰评估', '未知')}\n\n")
+                                with self.notebook_frame.batched_inserts():
+                                    self.notebook_frame.insert_result("【动爻卦理分析】\n", 'aspect_title')
+
+                                    has_dongyao = dongyao_result.get('有动爻', False)
+                                    if has_dongyao:
+                                        dongyao_list = dongyao_result.get('动爻列表', [])
+                                        if dongyao_list:
+                                            for i, dongyao in enumerate(dongyao_list, 1):
+                                                self.notebook_frame.insert_result(
+                                                    f"动爻{i}（{dongyao.get('爻位', '未知')}）：\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  月建关系：{dongyao.get('月建关系', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  日辰关系：{dongyao.get('日辰关系', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  动爻关系：{dongyao.get('动爻关系', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  特殊状态：{dongyao.get('特殊状态', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  回头生克：{dongyao.get('回头生克', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  变爻关系：{dongyao.get('变爻关系', '未知')}\n")
+                                                self.notebook_frame.insert_result(
+                                                    f"  旺衰评估：{dongyao.get('旺衰评估', '未知')}\n\n")
+                                        else:
+                                            self.notebook_frame.insert_result("卦中有动爻但分析列表为空\n\n")
                                     else:
-                                        self.notebook_frame.insert_result("卦中有动爻但分析列表为空\n\n")
-                                else:
-                                    self.notebook_frame.insert_result("卦中无动爻\n\n")
+                                        self.notebook_frame.insert_result("卦中无动爻\n\n")
 
                             self.update_ui(insert_dongyao_result)
                             logger.info("动爻卦理分析完成")
@@ -882,7 +972,7 @@ class SixYaoApp(ctk.CTk):
                     shuzi_response = AI(shuzi_input, model, shuzi_prompt).replace("json", "").replace("```", "")
 
                     # 检查是否是错误信息
-                    if not shuzi_response.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                    if not shuzi_response.startswith(_ERROR_PREFIXES):
                         try:
                             # 解析数字量化分析结果
                             import json
@@ -896,68 +986,69 @@ class SixYaoApp(ctk.CTk):
 
                             # 插入数字量化分析结果到解读结果编辑框
                             def insert_shuzi_result():
-                                self.notebook_frame.insert_result("【数字量化分析】\n", 'aspect_title')
-
-                                # 分析用神强弱指数
-                                if yongshen_dz:
-                                    try:
-                                        yuejianshu, richenshu = shuzilianghua(yuejian, richen, yongshen_dz)
-
-                                        if richenshu == "po":
-                                            # 日破情况，需要AI判断是暗动还是日破
-                                            ripo_prompt = prompts_module.RIPO_ANDONG_ANALYSIS_PROMPT
-                                            ripo_input = f"卦象信息：\n{hexagram_content}\n\n月建数字量化：{yuejianshu}\n\n请判断用神是暗动还是日破。"
-                                            ripo_response = AI(ripo_input, model, ripo_prompt)
+                                with self.notebook_frame.batched_inserts():
+                                    self.notebook_frame.insert_result("【数字量化分析】\n", 'aspect_title')
 
-                                            try:
-                                                ripo_result = json.loads(ripo_response)
-                                                result_text = ripo_result.get('text', '未知')
-                                                result_yiju = ripo_result.get('yiju', '无依据')
-                                                self.notebook_frame.insert_result(f"用神状态：{result_text}\n")
-                                                self.notebook_frame.insert_result(f"判断依据：{result_yiju}\n\n")
-                                            except json.JSONDecodeError:
-                                                self.notebook_frame.insert_result("用神状态：日破（AI分析失败）\n\n")
-                                        else:
-                                            # 正常情况，计算强弱指数
-                                            qiangruo_zhishu = yuejianshu + richenshu
-                                            self.notebook_frame.insert_result(f"用神强弱指数：{qiangruo_zhishu}\n")
-                                            self.notebook_frame.insert_result(f"  月建数：{yuejianshu}\n")
-                                            self.notebook_frame.insert_result(f"  日辰数：{richenshu}\n\n")
-                                    except Exception as e:
-                                        self.notebook_frame.insert_result(f"用神数字量化计算失败：{str(e)}\n\n")
-
-                                # 分析动爻强弱指数
-                                if dongyao_list:
-                                    for i, dongyao_dizhi in enumerate(dongyao_list, 1):
+                                    # 分析用神强弱指数
+                                    if yongshen_dz:
                                         try:
-                                            yuejianshu, richenshu = shuzilianghua(yuejian, richen, dongyao_dizhi)
+                                            yuejianshu, richenshu = shuzilianghua(yuejian, richen, yongshen_dz)
 
                                             if richenshu == "po":
                                                 # 日破情况，需要AI判断是暗动还是日破
                                                 ripo_prompt = prompts_module.RIPO_ANDONG_ANALYSIS_PROMPT
-                                                ripo_input = f"卦象信息：\n{hexagram_content}\n\n月建数字量化：{yuejianshu}\n\n请判断动爻{i}是暗动还是日破。"
+                                                ripo_input = f"卦象信息：\n{hexagram_content}\n\n月建数字量化：{yuejianshu}\n\n请判断用神是暗动还是日破。"
                                                 ripo_response = AI(ripo_input, model, ripo_prompt)
 
                                                 try:
                                                     ripo_result = json.loads(ripo_response)
                                                     result_text = ripo_result.get('text', '未知')
                                                     result_yiju = ripo_result.get('yiju', '无依据')
-                                                    self.notebook_frame.insert_result(f"动爻{i}状态：{result_text}\n")
+                                                    self.notebook_frame.insert_result(f"用神状态：{result_text}\n")
                                                     self.notebook_frame.insert_result(f"判断依据：{result_yiju}\n\n")
                                                 except json.JSONDecodeError:
-                                                    self.notebook_frame.insert_result(
-                                                        f"动爻{i}状态：日破（AI分析失败）\n\n")
+                                                    self.notebook_frame.insert_result("用神状态：日破（AI分析失败）\n\n")
                                             else:
                                                 # 正常情况，计算强弱指数
                                                 qiangruo_zhishu = yuejianshu + richenshu
-                                                self.notebook_frame.insert_result(
-                                                    f"动爻{i}强弱指数：{qiangruo_zhishu}\n")
+                                                self.notebook_frame.insert_result(f"用神强弱指数：{qiangruo_zhishu}\n")
                                                 self.notebook_frame.insert_result(f"  月建数：{yuejianshu}\n")
                                                 self.notebook_frame.insert_result(f"  日辰数：{richenshu}\n\n")
                                         except Exception as e:
-                                            self.notebook_frame.insert_result(f"动爻{i}数字量化计算失败：{str(e)}\n\n")
-                                else:
-                                    self.notebook_frame.insert_result("无动爻需要分析\n\n")
+                                            self.notebook_frame.insert_result(f"用神数字量化计算失败：{str(e)}\n\n")
+
+                                    # 分析动爻强弱指数
+                                    if dongyao_list:
+                                        for i, dongyao_dizhi in enumerate(dongyao_list, 1):
+                                            try:
+                                                yuejianshu, richenshu = shuzilianghua(yuejian, richen, dongyao_dizhi)
+
+                                                if richenshu == "po":
+                                                    # 日破情况，需要AI判断是暗动还是日破
+                                                    ripo_prompt = prompts_module.RIPO_ANDONG_ANALYSIS_PROMPT
+                                                    ripo_input = f"卦象信息：\n{hexagram_content}\n\n月建数字量化：{yuejianshu}\n\n请判断动爻{i}是暗动还是日破。"
+                                                    ripo_response = AI(ripo_input, model, ripo_prompt)
+
+                                                    try:
+                                                        ripo_result = json.loads(ripo_response)
+                                                        result_text = ripo_result.get('text', '未知')
+                                                        result_yiju = ripo_result.get('yiju', '无依据')
+                                                        self.notebook_frame.insert_result(f"动爻{i}状态：{result_text}\n")
+                                                        self.notebook_frame.insert_result(f"判断依据：{result_yiju}\n\n")
+                                                    except json.JSONDecodeError:
+                                                        self.notebook_frame.insert_result(
+                                                            f"动爻{i}状态：日破（AI分析失败）\n\n")
+                                                else:
+                                                    # 正常情况，计算强弱指数
+                                                    qiangruo_zhishu = yuejianshu + richenshu
+                                                    self.notebook_frame.insert_result(
+                                                        f"动爻{i}强弱指数：{qiangruo_zhishu}\n")
+                                                    self.notebook_frame.insert_result(f"  月建数：{yuejianshu}\n")
+                                                    self.notebook_frame.insert_result(f"  日辰数：{richenshu}\n\n")
+                                            except Exception as e:
+                                                self.notebook_frame.insert_result(f"动爻{i}数字量化计算失败：{str(e)}\n\n")
+                                    else:
+                                        self.notebook_frame.insert_result("无动爻需要分析\n\n")
 
                             self.update_ui(insert_shuzi_result)
                             logger.info("数字量化分析完成")
@@ -995,8 +1086,8 @@ class SixYaoApp(ctk.CTk):
                 self.status_frame.update_status("获取分析方面...")
             
             self.update_ui(update_aspects_status)
-            # 收集前期分析结果
-            previous_analysis = self.notebook_frame.result_text.get(1.0, tk.END)
+            # 收集前期分析结果（在主线程中读取，此前排队的插入已全部完成）
+            previous_analysis = self._call_in_main_thread(self.notebook_frame.get_result_text)
 
             # 构建包含前期分析结果的输入
             analysis_input = f"问题：{question}\n\n前期分析结果：\n{previous_analysis}\n\n请基于以上信息分析需要解读的方面。"
@@ -1007,7 +1098,7 @@ class SixYaoApp(ctk.CTk):
                     ai_response = AI(analysis_input, model, analysis_prompt)
 
                     # 检查是否是错误信息
-                    if ai_response.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                    if ai_response.startswith(_ERROR_PREFIXES):
                         def update_api_error():
                             self.status_frame.update_status("分析失败，请重试")
                             self.notebook_frame.insert_result(f"分析失败: {ai_response}", 'error')
@@ -1048,7 +1139,7 @@ class SixYaoApp(ctk.CTk):
                     try:
                         # 从前期分析结果中提取用神卦理信息用于RAG搜索
                         yongshen_guli_info = ""
-                        previous_text = self.notebook_frame.result_text.get(1.0, tk.END)
+                        previous_text = self._call_in_main_thread(self.notebook_frame.get_result_text)
 
                         # 提取用神卦理分析部分
                         if "【用神卦理分析】" in previous_text:
@@ -1101,13 +1192,14 @@ class SixYaoApp(ctk.CTk):
                         
                         # 格式化搜索结果作为参考资料
                         if search_results:
-                            rag_context = "\n\n参考资料：\n"
+                            rag_parts = ["\n\n参考资料：\n"]
                             for idx, result in enumerate(search_results, 1):
-                                rag_context += f"{idx}. {result['content'][:200]}...\n"
+                                rag_parts.append(f"{idx}. {result['content'][:200]}...\n")
                                 # 收集来源文件名
                                 if result['source_file']:
                                     rag_references.add(result['source_file'])
-                            rag_context += "\n"
+                            rag_parts.append("\n")
+                            rag_context = "".join(rag_parts)
 
                             logger.info(f"为方面'{aspect}'找到{len(search_results)}个相关参考（使用用神卦理搜索）")
                     except Exception as e:
@@ -1120,7 +1212,7 @@ class SixYaoApp(ctk.CTk):
                     aspect_result = AI(enhanced_prompt, model, interpretation_prompt)
                     
                     # 检查是否是错误信息
-                    if aspect_result.startswith(("API请求失败", "API响应解析失败", "处理失败")):
+                    if aspect_result.startswith(_ERROR_PREFIXES):
                         self.update_ui(lambda asp=aspect, result=aspect_result: self.notebook_frame.insert_result(f"分析方面 '{asp}' 失败: {result}", 'error'))
                         continue
                 except Exception as e:
@@ -1131,8 +1223,6 @@ class SixYaoApp(ctk.CTk):
                 self.update_ui(lambda i=i, aspect=aspect: self.notebook_frame.insert_result(f"{i}、{aspect}：", 'aspect_title'))
                 
                 # 解析并插入解读结果，高亮括号内的内容
-                import re
-                
                 # 批量收集所有要插入的内容，减少UI更新频率
                 content_parts = []
                 current_pos = 0
@@ -1171,8 +1261,9 @@ class SixYaoApp(ctk.CTk):
                 
                 # 批量更新UI，减少调用频率
                 def batch_insert_content():
-                    for content_type, content in content_parts:
-                        self.notebook_frame.insert_result(content, content_type)
+                    with self.notebook_frame.batched_inserts():
+                        for content_type, content in content_parts:
+                            self.notebook_frame.insert_result(content, content_type)
                 
                 self.update_ui(batch_insert_content)
             
@@ -1184,20 +1275,21 @@ class SixYaoApp(ctk.CTk):
             
             self.update_ui(update_conclusion_status)
             
-            # 收集所有方面的结果以便生成结论
-            full_analysis_text = self.notebook_frame.result_text.get(1.0, tk.END)
+            # 收集所有方面的结果以便生成结论（在主线程中读取，确保最后一个方面已插入）
+            full_analysis_text = self._call_in_main_thread(self.notebook_frame.get_result_text)
             conclusion_prompt = prompts_module.CONCLUSION_PROMPT.format(full_analysis_text)
             try:
-                conclusion = AI(conclusion_prompt, model)
+                conclusion = self._generate_conclusion(AI, conclusion_prompt, model)
                 
                 # 批量插入结论内容
                 def batch_insert_conclusion():
-                    self.notebook_frame.insert_result("结论：", 'conclusion_title')
-                    # 检查是否是错误信息
-                    if conclusion.startswith(("API请求失败", "API响应解析失败", "处理失败")):
-                        self.notebook_frame.insert_result(f"结论生成失败: {conclusion}\n", 'error')
-                    else:
-                        self.notebook_frame.insert_result(conclusion + "\n", 'main_text')
+                    with self.notebook_frame.batched_inserts():
+                        self.notebook_frame.insert_result("结论：", 'conclusion_title')
+                        # 检查是否是错误信息
+                        if conclusion.startswith(_ERROR_PREFIXES):
+                            self.notebook_frame.insert_result(f"结论生成失败: {conclusion}\n", 'error')
+                        else:
+                            self.notebook_frame.insert_result(conclusion + "\n", 'main_text')
                 
                 self.update_ui(batch_insert_conclusion)
             except Exception as e:
@@ -1210,12 +1302,13 @@ class SixYaoApp(ctk.CTk):
             # 显示参考文献
             if rag_references:
                 def batch_insert_references():
-                    self.notebook_frame.insert_result("\n", 'main_text')
-                    self.notebook_frame.insert_result("参考文件：", 'reference_title')
-                    self.notebook_frame.insert_result("\n", 'main_text')
-                    for ref_file in sorted(rag_references):
-                        self.notebook_frame.insert_result(f"• {ref_file}\n", 'reference_text')
-                    self.notebook_frame.insert_result("\n", 'main_text')
+                    with self.notebook_frame.batched_inserts():
+                        self.notebook_frame.insert_result("\n", 'main_text')
+                        self.notebook_frame.insert_result("参考文件：", 'reference_title')
+                        self.notebook_frame.insert_result("\n", 'main_text')
+                        for ref_file in sorted(rag_references):
+                            self.notebook_frame.insert_result(f"• {ref_file}\n", 'reference_text')
+                        self.notebook_frame.insert_result("\n", 'main_text')
                 
                 self.update_ui(batch_insert_references)
             
@@ -1248,35 +1341,141 @@ class SixYaoApp(ctk.CTk):
             # 分析过程出错，记录到日志
             logger.error(f"分析过程出错: {error_msg}")
         finally:
+            # 结束流式插入，恢复结果文本框只读
+            self.update_ui(lambda: self.notebook_frame.end_streaming())
             # 恢复按钮状态
             self.update_ui(lambda: self.input_frame.set_buttons_state("normal"))
     
     def update_ui(self, func):
-        """在主线程中更新UI"""
-        self.after(0, func)
+        """在主线程中更新UI（可从后台线程调用），窗口销毁后的更新直接丢弃"""
+        if self._destroyed:
+            return
+        self._ui_queue.put(func)
+        with self._ui_drain_lock:
+            if self._ui_drain_job is None and not self._destroyed:
+                try:
+                    self._ui_drain_job = self.after_idle(self._drain_ui_queue)
+                except (tk.TclError, RuntimeError):
+                    # 窗口已在其他线程中销毁
+                    pass
+    
+    def _call_in_main_thread(self, func, timeout=_MAIN_THREAD_CALL_TIMEOUT):
+        """在主线程中执行func并返回其结果（供后台线程读取控件内容）
+        
+        调用经由UI更新队列执行，此前排队的插入等更新都会先完成，读到的是最新内容；
+        控件和缓存只在主线程中访问。超时抛出TimeoutError，窗口已销毁时抛出RuntimeError。
+        """
+        if self._destroyed:
+            raise RuntimeError("窗口已关闭")
+        future = Future()
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+        
+        self.update_ui(run)
+        return future.result(timeout)
+    
+    def _drain_ui_queue(self):
+        """在主线程中执行队列中积压的UI更新"""
+        # 先清除标志再取队列：执行期间新加入的更新会重新安排回调，不会遗漏
+        with self._ui_drain_lock:
+            self._ui_drain_job = None
+        while True:
+            try:
+                func = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"执行UI更新时出错: {e}")
+    
+    def _load_project_module(self, module_name, *path_parts):
+        """从项目根目录按文件路径动态加载模块"""
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        file_path = os.path.join(project_root, *path_parts)
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    
+    def _get_api_module(self):
+        """获取api.py模块，仅在首次调用时加载"""
+        if self._api_module is None:
+            self._api_module = self._load_project_module("api_module", 'api.py')
+        return self._api_module
+    
+    def _get_prompts_module(self):
+        """获取src/prompts.py模块，仅在首次调用时加载"""
+        if self._prompts_module is None:
+            self._prompts_module = self._load_project_module("prompts_module", 'src', 'prompts.py')
+        return self._prompts_module
+    
+    def _generate_conclusion(self, AI, conclusion_prompt, model):
+        """生成总结论，配置了备用模型时与主模型并发请求，取最快的成功结果"""
+        backup_model = self._backup_model
+        if not backup_model or backup_model == model:
+            return AI(conclusion_prompt, model)
+        
+        return first_successful(
+            lambda: AI(conclusion_prompt, model),
+            lambda: AI(conclusion_prompt, backup_model)
+        )
+    
+    def _schedule_history_save(self):
+        """安排一次延迟的历史记录保存，期间的多次更新只写盘一次"""
+        if self._history_save_job:
+            self.after_cancel(self._history_save_job)
+        self._history_save_job = self.after(2000, self._flush_history)
+    
+    def _flush_history(self):
+        """立即保存待写入的历史记录"""
+        if self._history_save_job:
+            self.after_cancel(self._history_save_job)
+            self._history_save_job = None
+        self.history_manager.save_history()
     
     def handle_chat_message(self, message, model):
         """处理聊天消息"""
-        # 使用线程避免UI卡顿
-        import threading
-        thread = threading.Thread(target=self._process_chat_message, args=(message, model))
-        thread.daemon = True
-        thread.start()
+        # 用于查找历史记录的问题、起卦方式和模型在主线程中读取，后台线程不访问输入组件
+        record_key = (
+            self.input_frame.get_question(),
+            self.input_frame.get_divination_method(),
+            self.input_frame.get_model()
+        )
+        # 当前解读结果作为聊天上下文，同样在主线程中读取
+        current_result = self.notebook_frame.get_result_text().strip()
+        # 交给常驻聊天线程处理，避免UI卡顿
+        self._chat_queue.put((message, model, record_key, current_result))
+    
+    def _chat_worker(self):
+        """聊天线程主循环：依次处理队列中的消息，收到None时退出"""
+        while True:
+            item = self._chat_queue.get()
+            if item is None:
+                break
+            self._process_chat_message(*item)
 
     def save_to_history(self, question, hexagram_content, divination_method, yongshen, fangmian, model):
-        """保存分析结果到历史记录"""
+        """保存分析结果到历史记录（在后台线程中调用）"""
         try:
-            # 获取分析结果（获取纯文本，不包含格式标签）
-            result_text = self.notebook_frame.result_text.get(1.0, "end-1c")
-            
-            # 获取聊天消息记录（如果有）
-            chat_messages = []
-            if hasattr(self.notebook_frame, 'chat_messages'):
-                chat_messages = [{                    
-                    'message': msg['message'],
-                    'is_user': msg['is_user'],
-                    'is_error': msg.get('is_error', False)
-                } for msg in self.notebook_frame.chat_messages]
+            def collect_content():
+                """在主线程中获取分析结果（纯文本，不包含格式标签）和聊天消息记录"""
+                chat_messages = []
+                if hasattr(self.notebook_frame, 'chat_messages'):
+                    chat_messages = [{
+                        'message': msg['message'],
+                        'is_user': msg['is_user'],
+                        'is_error': msg.get('is_error', False)
+                    } for msg in self.notebook_frame.chat_messages]
+                return self.notebook_frame.get_result_text(), chat_messages
+            
+            result_text, chat_messages = self._call_in_main_thread(collect_content)
             
             # 添加到历史记录
             record_id = self.history_manager.add_record(
@@ -1357,50 +1556,70 @@ class SixYaoApp(ctk.CTk):
                     
                     # 选择保存位置
                     if export_format == "PDF":
-                        file_path = filedialog.asksaveasfilename(
-                            defaultextension=".pdf",
-                            filetypes=[("PDF文件", "*.pdf")],
-                            title="保存PDF文件"
-                        )
+                        extension, filetypes, dialog_title = ".pdf", [("PDF文件", "*.pdf")], "保存PDF文件"
                     elif export_format == "Word":
-                        file_path = filedialog.asksaveasfilename(
-                            defaultextension=".docx",
-                            filetypes=[("Word文档", "*.docx")],
-                            title="保存Word文档"
-                        )
+                        extension, filetypes, dialog_title = ".docx", [("Word文档", "*.docx")], "保存Word文档"
                     else:  # Text
-                        file_path = filedialog.asksaveasfilename(
-                            defaultextension=".txt",
-                            filetypes=[("文本文件", "*.txt")],
-                            title="保存文本文件"
-                        )
+                        extension, filetypes, dialog_title = ".txt", [("文本文件", "*.txt")], "保存文本文件"
+                    
+                    # 先处理完挂起的界面事件，再以导出窗口为父窗口打开对话框，
+                    # 并从上次导出的目录开始，避免系统重新枚举默认目录
+                    export_window.update_idletasks()
+                    initial_dir = config_manager.get_last_export_dir()
+                    if not initial_dir or not os.path.isdir(initial_dir):
+                        initial_dir = None
+                    file_path = filedialog.asksaveasfilename(
+                        parent=export_window,
+                        initialdir=initial_dir,
+                        defaultextension=extension,
+                        filetypes=filetypes,
+                        title=dialog_title
+                    )
                     
                     if not file_path:
                         return
                     
-                    # 获取分析结果
-                    result_text = self.notebook_frame.result_text.get(1.0, "end-1c")
-                    question = self.input_frame.get_question()
+                    config_manager.set_last_export_dir(os.path.dirname(file_path))
                     
-                    # 调用导出功能
-                    success, message = export_analysis_results(
-                        file_path=file_path,
-                        title="六爻分析结果",
-                        question=question,
-                        hexagram_info="",  # 可以根据需要添加卦象信息
-                        analysis_results=result_text,
-                        conclusion="",  # 可以根据需要提取结论
-                        language="zh_CN"
-                    )
+                    # 获取分析结果（控件内容只能在主线程中读取）
+                    result_text = self.notebook_frame.get_result_text()
+                    question = self.input_frame.get_question()
                     
                     export_window.destroy()
+                    self.status_frame.update_status("正在导出...")
+                    self.status_frame.update_progress(0)
                     
-                    if success:
-                        # 导出成功，记录到日志
-                        logger.info(f"分析结果已成功导出到: {file_path}")
-                    else:
-                        # 导出错误，记录到日志
-                        logger.error(f"导出过程中发生错误: {message}")
+                    def finish_export(success, message):
+                        self.status_frame.update_progress(1.0)
+                        if success:
+                            # 导出成功，记录到日志
+                            logger.info("分析结果已成功导出到: %s", file_path)
+                            self.status_frame.update_status("导出完成")
+                        else:
+                            # 导出错误，记录到日志
+                            logger.error("导出过程中发生错误: %s", message)
+                            self.status_frame.update_status("导出失败")
+                    
+                    def run_export():
+                        try:
+                            # 调用导出功能
+                            success, message = export_analysis_results(
+                                file_path=file_path,
+                                title="六爻分析结果",
+                                question=question,
+                                hexagram_info="",  # 可以根据需要添加卦象信息
+                                analysis_results=result_text,
+                                conclusion="",  # 可以根据需要提取结论
+                                language="zh_CN",
+                                progress_callback=lambda value: self.update_ui(
+                                    lambda: self.status_frame.update_progress(value))
+                            )
+                        except Exception as e:
+                            success, message = False, str(e)
+                        self.update_ui(lambda: finish_export(success, message))
+                    
+                    # 在后台线程中导出，避免PDF/Word生成时界面卡顿
+                    threading.Thread(target=run_export, daemon=True).start()
                         
                 except Exception as e:
                     export_window.destroy()
@@ -1417,120 +1636,83 @@ class SixYaoApp(ctk.CTk):
             logger.error(f"显示导出对话框时出错: {e}")
             # 显示导出对话框错误，已记录到日志
     
-    def _process_chat_message(self, message, model):
-        """在后台线程中处理聊天消息"""
+    def _search_chat_references(self, message):
+        """针对聊天问题执行RAG检索，返回(检索结果, 参考资料文本)"""
+        search_results = None
+        rag_context = ""
+        if self.rag_searcher:
+            try:
+                # 从设置页面获取RAG配置参数
+                rag_result_count = 10  # 默认值
+                rag_threshold = 0.3  # 默认值
+
+                if hasattr(self, 'settings_frame') and self.settings_frame:
+                    rag_result_count = self.settings_frame.get_rag_result_count()
+                    rag_threshold = self.settings_frame.get_rag_threshold()
+                else:
+                    # 如果设置页面不可用，从配置管理器获取
+                    rag_result_count = config_manager.get('rag_result_count', 10)
+                    rag_threshold = config_manager.get('rag_threshold', 0.3)
+
+                # 执行RAG搜索
+                search_query = f"{message}"
+                search_results = self.rag_searcher.search(
+                    query=search_query,
+                    search_method='hybrid',
+                    top_k=rag_result_count,
+                    similarity_threshold=rag_threshold,
+                    use_query_expansion=True
+                )
+
+                # 格式化搜索结果作为参考资料
+                if search_results:
+                    rag_parts = ["\n\n参考资料：\n"]
+                    rag_parts.extend(
+                        f"{idx}. {result['content'][:200]}...\n"
+                        for idx, result in enumerate(search_results, 1)
+                    )
+                    rag_parts.append("\n")
+                    rag_context = "".join(rag_parts)
+
+                    logger.info("为聊天问题'%s...'找到%d个相关参考", message[:30], len(search_results))
+            except Exception as e:
+                logger.error(f"聊天RAG搜索失败: {e}")
+                rag_context = ""
+        return search_results, rag_context
+    
+    def _process_chat_message(self, message, model, record_key, current_result):
+        """在后台线程中处理聊天消息
+        
+        Args:
+            message: 用户消息
+            model: 聊天使用的模型
+            record_key: 在主线程中读取的(问题, 起卦方式, 模型)，用于查找当前历史记录
+            current_result: 在主线程中读取的当前解读结果，作为聊天上下文
+        """
         try:
-            # 导入API模块和提示词
-            import sys
-            import os
-            import importlib.util
-            
-            # 获取项目根目录
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            api_file_path = os.path.join(project_root, 'api.py')
-            prompts_file_path = os.path.join(project_root, 'src', 'prompts.py')
-            
-            # 动态导入api.py模块
-            spec = importlib.util.spec_from_file_location("api_module", api_file_path)
-            api_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(api_module)
-            
-            # 动态导入prompts.py模块
-            spec = importlib.util.spec_from_file_location("prompts_module", prompts_file_path)
-            prompts_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(prompts_module)
+            # 导入API模块和提示词（首次加载后缓存）
+            api_module = self._get_api_module()
+            prompts_module = self._get_prompts_module()
             
             AI = api_module.AI
             INTERPRETATION_CHAT_PROMPT = prompts_module.INTERPRETATION_CHAT_PROMPT
             
-            # 获取当前解读结果作为上下文
-            current_result = self.notebook_frame.result_text.get(1.0, tk.END).strip()
-
-            # 提取各个分析部分的内容
-            analysis_sections = {}
-            sections = ["【用神判断】", "【用神卦理分析】", "【动爻卦理分析】", "【数字量化分析】"]
-
-            for i, section in enumerate(sections):
-                if section in current_result:
-                    start_idx = current_result.find(section)
-                    # 找到下一个分析部分的开始位置作为结束位置
-                    end_idx = len(current_result)
-                    for j in range(i + 1, len(sections)):
-                        next_section_idx = current_result.find(sections[j], start_idx)
-                        if next_section_idx != -1:
-                            end_idx = next_section_idx
-                            break
-
-                    # 如果没有找到下一个分析部分，尝试找其他可能的结束标志
-                    if end_idx == len(current_result):
-                        for end_marker in ["【方面分析】", "【综合解读】", "【总结论】"]:
-                            marker_idx = current_result.find(end_marker, start_idx)
-                            if marker_idx != -1:
-                                end_idx = marker_idx
-                                break
-
-                    analysis_sections[section] = current_result[start_idx:end_idx].strip()
-
-            # 构建包含分析部分的聊天提示词
-            analysis_context = ""
-            for section, content in analysis_sections.items():
-                if content:
-                    analysis_context += f"{content}\n\n"
-
-            # 执行RAG检索
-            rag_context = ""
-            rag_references = set()
-            if self.rag_searcher:
-                try:
-                    # 从设置页面获取RAG配置参数
-                    rag_result_count = 10  # 默认值
-                    rag_threshold = 0.3  # 默认值
-
-                    if hasattr(self, 'settings_frame') and self.settings_frame:
-                        rag_result_count = self.settings_frame.get_rag_result_count()
-                        rag_threshold = self.settings_frame.get_rag_threshold()
-                    else:
-                        # 如果设置页面不可用，从配置管理器获取
-                        rag_result_count = config_manager.get('rag_result_count', 10)
-                        rag_threshold = config_manager.get('rag_threshold', 0.3)
-
-                    # 执行RAG搜索
-                    search_query = f"{message}"
-                    search_results = self.rag_searcher.search(
-                        query=search_query,
-                        search_method='hybrid',
-                        top_k=rag_result_count,
-                        similarity_threshold=rag_threshold,
-                        use_query_expansion=True
-                    )
-
-                    # 格式化搜索结果作为参考资料
-                    if search_results:
-                        rag_context = "\n\n参考资料：\n"
-                        for idx, result in enumerate(search_results, 1):
-                            rag_context += f"{idx}. {result['content'][:200]}...\n"
-                            # 收集来源文件名
-                            if result['source_file']:
-                                rag_references.add(result['source_file'])
-                        rag_context += "\n"
-
-                        logger.info(f"为聊天问题'{message[:30]}...'找到{len(search_results)}个相关参考")
-                except Exception as e:
-                    logger.error(f"聊天RAG搜索失败: {e}")
-                    rag_context = ""
+            # 分析部分提取与RAG检索互不依赖，并发执行
+            async def gather_context():
+                return await asyncio.gather(
+                    asyncio.to_thread(_build_analysis_context, current_result),
+                    asyncio.to_thread(self._search_chat_references, message)
+                )
             
-            chat_prompt = f"""{INTERPRETATION_CHAT_PROMPT}
-
-【前期分析结果】
-{analysis_context}
-【完整解读结果】
-{current_result}
-【参考文件】
-{rag_context}
-【用户问题】
-{message}
-
-请基于上述解读结果和参考资料，针对用户的具体问题给出专业解答。解答中不要出现参考文件的序号及文件名。"""
+            analysis_context, (search_results, rag_context) = asyncio.run(gather_context())
+            
+            chat_prompt = _CHAT_PROMPT_TEMPLATE.substitute(
+                base=INTERPRETATION_CHAT_PROMPT,
+                analysis=analysis_context,
+                full=current_result,
+                rag=rag_context,
+                msg=message
+            )
             
             # 调用AI获取回复
             try:
@@ -1538,66 +1720,65 @@ class SixYaoApp(ctk.CTk):
                 
                 # 在主线程中更新UI
                 # 检查是否是错误信息
-                is_error = response.startswith(("API请求失败", "API响应解析失败", "处理失败"))
+                is_error = response.startswith(_ERROR_PREFIXES)
                 if is_error:
                     ai_response = f"抱歉，回复生成失败: {response}"
-                    self.after(0, lambda: self.notebook_frame.add_ai_response(ai_response, is_error=True))
+                    self.update_ui(lambda: self.notebook_frame.add_ai_response(ai_response, is_error=True))
                 else:
                     ai_response = response
-                    self.after(0, lambda: self.notebook_frame.add_ai_response(ai_response))
+                    self.update_ui(lambda: self.notebook_frame.add_ai_response(ai_response))
                 
                 # 更新当前历史记录中的聊天消息
-                self._update_history_chat_messages(message, ai_response, search_results, is_error)
+                self._update_history_chat_messages(record_key, message, ai_response, search_results, is_error)
                 
             except Exception as e:
                 error_msg = f"抱歉，回复生成失败: {str(e)}"
-                self.after(0, lambda: self.notebook_frame.add_ai_response(error_msg, is_error=True))
+                self.update_ui(lambda: self.notebook_frame.add_ai_response(error_msg, is_error=True))
                 
                 # 更新当前历史记录中的聊天消息（错误情况）
-                self._update_history_chat_messages(message, error_msg, None, True)
+                self._update_history_chat_messages(record_key, message, error_msg, None, True)
             
         except Exception as e:
+            # 非预期错误，记录完整堆栈便于排查
             error_msg = f"聊天功能出错: {str(e)}"
-            logger.error(error_msg)
+            logger.exception(error_msg)
             # 在主线程中更新UI
-            self.after(0, lambda: self.notebook_frame.add_ai_response(error_msg, is_error=True))
+            self.update_ui(lambda: self.notebook_frame.add_ai_response(error_msg, is_error=True))
             
             # 更新当前历史记录中的聊天消息（错误情况）
-            self._update_history_chat_messages(message, error_msg, None, True)
+            self._update_history_chat_messages(record_key, message, error_msg, None, True)
 
-    def _update_history_chat_messages(self, user_message, ai_response, references=None, is_error=False):
-        """更新当前历史记录中的聊天消息"""
+    def _update_history_chat_messages(self, record_key, user_message, ai_response, references=None, is_error=False):
+        """更新当前历史记录中的聊天消息
+        
+        Args:
+            record_key: 在主线程中读取的(问题, 起卦方式, 模型)
+        """
         try:
             # 添加RAG检索参考文档
             if references and not is_error:
                 try:
                     # 格式化参考文档
-                    references_text = "\n\n📚 参考文档:\n"
+                    parts = []
                     for i, doc in enumerate(references, 1):
                         # 截断过长的文档片段
-                        snippet = doc['content'][:150] + '...' if len(doc['content']) > 150 else doc['content']
-                        references_text += f"{i}. {references['source_file']} (相似度: {doc['similarity']:.2f})\n   {snippet}\n"
+                        content = doc['content']
+                        snippet = content[:150] + '...' if len(content) > 150 else content
+                        parts.append(f"{i}. {doc['source_file']} (相似度: {doc['similarity']:.2f})\n   {snippet}\n")
+                    references_text = "\n\n📚 参考文档:\n" + "".join(parts)
 
                     # 将参考文档添加到AI响应中
                     ai_response += references_text
-                except Exception as e:
+                except (KeyError, TypeError, ValueError) as e:
                     logger.error(f"处理参考文档失败: {str(e)}")
                     # 不中断对话流程，仅记录错误
             
-            # 获取当前问题和分析结果
-            question = self.input_frame.get_question()
-            divination_method = self.input_frame.get_divination_method()
-            model = self.input_frame.get_model()
+            # 当前问题、起卦方式和模型（发送消息时在主线程中读取）
+            question, divination_method, model = record_key
             
             # 查找当前记录 - 只匹配问题、起卦方式和模型，不再匹配卦象信息和分析结果
             # 这样可以更灵活地找到匹配的历史记录
-            current_record = None
-            for record in self.history_manager.records:
-                if (record.question == question and 
-                    record.divination_method == divination_method and 
-                    record.model == model):
-                    current_record = record
-                    break
+            current_record = self.history_manager.find_record(question, divination_method, model)
             
             if current_record:
                 # 确保记录有chat_messages属性
@@ -1618,9 +1799,9 @@ class SixYaoApp(ctk.CTk):
                     'is_error': is_error
                 })
                 
-                # 保存更新后的历史记录
-                self.history_manager.save_history()
-                logger.info(f"已更新历史记录中的聊天消息: {user_message[:30]}...")
+                # 延迟保存更新后的历史记录，连续对话时合并为一次写盘
+                self.update_ui(self._schedule_history_save)
+                logger.info("已更新历史记录中的聊天消息: %s...", user_message[:30])
             else:
                 logger.warning("无法找到匹配的历史记录来更新聊天消息")
                 
@@ -1707,20 +1888,10 @@ class SixYaoApp(ctk.CTk):
             
             # 在头部区域显示临时提示 - 使用grid布局
             if hasattr(self, 'header_frame'):
-                # 创建临时提示标签
-                status_label = ctk.CTkLabel(
-                    self.header_frame,
-                    text=f"✅ {message}",
-                    font=ctk.CTkFont(size=12),
-                    text_color=("#2E8B57", "#90EE90")  # 绿色文字
-                )
-                # 使用grid布局而不是pack，放在第2行，跨越两列
-                status_label.grid(row=2, column=0, columnspan=2, pady=(5, 0), sticky="w", padx=20)
-                
                 # 5秒后自动隐藏
-                self.after(5000, lambda: status_label.destroy())
+                self.header_frame.show_status(f"✅ {message}", duration=5000)
             
-            logger.info(f"显示数据库状态: {message}")
+            logger.info("显示数据库状态: %s", message)
         except Exception as e:
             logger.error(f"显示数据库状态时出错: {e}")
     
@@ -1754,6 +1925,11 @@ class SixYaoApp(ctk.CTk):
             if hasattr(self, 'settings_frame') and self.settings_frame:
                 self.settings_frame.save_rag_settings()
             
+            # 先执行队列中尚未处理的UI更新（其中可能有安排历史记录保存的请求），再保存尚未写盘的聊天记录
+            self._drain_ui_queue()
+            if self._history_save_job:
+                self._flush_history()
+            
             # 保存配置文件
             config_manager.save_config()
             logger.info(f"应用退出时已保存配置：主题模式={current_mode}, 窗口几何={geometry}")
@@ -1766,7 +1942,13 @@ class SixYaoApp(ctk.CTk):
     def destroy(self):
         """销毁窗口时清理资源"""
         try:
-            pass
+            # 此后后台线程提交的UI更新全部丢弃，聊天线程处理完当前消息后退出
+            with self._ui_drain_lock:
+                self._destroyed = True
+                if self._ui_drain_job:
+                    self.after_cancel(self._ui_drain_job)
+                    self._ui_drain_job = None
+            self._chat_queue.put(None)
         except Exception as e:
             logger.error(f"清理资源时出错: {e}")
         finally:
@@ -2,20 +2,31 @@
 
 import os
 import tkinter as tk
+from functools import lru_cache
 
 import customtkinter as ctk
-from PIL import Image
 
 from config import RESOURCES_DIR
 from config.constants import APP_NAME, APP_VERSION
 from config.constants import TEXT
 from config.ui_config import get_ui_settings
 from utils.animation import pulse_animation
+from utils.config_manager import config_manager
 from utils.logger import setup_logger
 from utils.ui_components import ThemeableWidget, IOSButton
 
 logger = setup_logger(__name__)
 
+
+@lru_cache(maxsize=1)
+def _load_icon_image(icon_path):
+    """加载并缩放应用图标，仅在图标文件存在时才导入PIL，解码结果会被缓存"""
+    from PIL import Image
+    
+    icon_image = Image.open(icon_path)
+    return icon_image.resize((40, 40), Image.LANCZOS)
+
+
 class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
     """应用程序头部区域，包含标题、副标题和主题切换按钮"""
     
@@ -57,8 +68,7 @@ class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
             # 尝试加载PNG图标
             icon_path = os.path.join(RESOURCES_DIR, "icons", "app_icon.png")
             if os.path.exists(icon_path):
-                icon_image = Image.open(icon_path)
-                icon_image = icon_image.resize((40, 40), Image.LANCZOS)
+                icon_image = _load_icon_image(icon_path)
                 self.app_icon = ctk.CTkImage(light_image=icon_image, dark_image=icon_image, size=(40, 40))
                 
                 # 创建图标标签
@@ -123,6 +133,16 @@ class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
         )
         self.subtitle_label.grid(row=1, column=0, sticky="w", padx=20, pady=(0, 10))
         
+        # 临时状态提示标签 - 创建一次，显示时才放入网格
+        self.status_var = tk.StringVar()
+        self.status_label = ctk.CTkLabel(
+            self,
+            textvariable=self.status_var,
+            font=ctk.CTkFont(size=12),
+            text_color=("#2E8B57", "#90EE90")  # 绿色文字
+        )
+        self._status_hide_job = None
+        
         # 创建按钮容器
         button_frame = ctk.CTkFrame(self, fg_color="transparent")
         button_frame.grid(row=0, column=1, padx=20, pady=10)
@@ -140,8 +160,8 @@ class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
         )
         self.theme_button.pack(side="left")
         
-        # 应用脉冲动画到标题
-        if self.ui_settings["animation"]["enabled"]:
+        # 应用脉冲动画到标题（开启减少动态效果时跳过）
+        if self.ui_settings["animation"]["enabled"] and not config_manager.get('reduced_motion', False):
             # 使用不带透明度的颜色
             start_color = self.get_color("primary_color")
             end_color = self.get_color("gray_2")
@@ -158,27 +178,28 @@ class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
     
     def toggle_theme(self):
         """切换主题模式"""
-        # 调用主应用程序的主题切换方法
+        # 调用主应用程序的主题切换方法，主题生效后由主程序统一调用update_theme
         self.master.toggle_theme()
-        
-        # 更新自身主题
-        self.update_theme()
     
     def update_theme(self):
         """更新主题颜色"""
         super().update_theme()
         
+        # 每种颜色只查询一次
+        card_bg = self.get_color("card_bg")
+        secondary_text = self.get_color("secondary_text")
+        
         # 更新框架颜色
-        self.configure(fg_color=self.get_color("card_bg"))
+        self.configure(fg_color=card_bg)
         
         # 更新标题颜色
         self.title_label.configure(text_color=self.get_color("primary_color"))
-        self.subtitle_label.configure(text_color=self.get_color("secondary_text"))
-        self.version_label.configure(text_color=self.get_color("secondary_text"))
+        self.subtitle_label.configure(text_color=secondary_text)
+        self.version_label.configure(text_color=secondary_text)
         
         # 更新图标背景色（如果是tk.Label）
         if hasattr(self, 'icon_label') and isinstance(self.icon_label, tk.Label):
-            self.icon_label.configure(bg=self.get_color("card_bg"))
+            self.icon_label.configure(bg=card_bg)
         
         # 设置按钮更新代码已移除
         
@@ -187,6 +208,22 @@ class HeaderFrame(ctk.CTkFrame, ThemeableWidget):
     
 
     
+    def show_status(self, message, duration=5000):
+        """在头部区域显示临时提示，重复调用时复用同一标签并重新计时"""
+        self.status_var.set(message)
+        if not self.status_label.winfo_ismapped():
+            # 放在第2行，跨越两列
+            self.status_label.grid(row=2, column=0, columnspan=2, pady=(5, 0), sticky="w", padx=20)
+        
+        if self._status_hide_job:
+            self.after_cancel(self._status_hide_job)
+        self._status_hide_job = self.after(duration, self._hide_status)
+    
+    def _hide_status(self):
+        """隐藏临时提示"""
+        self._status_hide_job = None
+        self.status_label.grid_remove()
+    
     def set_title(self, title):
         """设置标题文本"""
         self.title_label.configure(text=title)
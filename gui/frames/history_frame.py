@@ -5,24 +5,50 @@
 提供历史记录的查看、搜索、管理功能
 """
 
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from tkinter import ttk, filedialog
 from typing import List, Optional
 
 import customtkinter as ctk
 
+from config.languages import t
 from config.settings import DIVINATION_METHODS
 from config.ui_config import UI_SETTINGS
-from utils.logger import setup_logger
-
-logger = setup_logger(__name__)
-from config.languages import t
 from utils.history import HistoryManager, HistoryRecord
 from utils.logger import setup_logger
 from utils.ui_components import IOSMessageBox
 
 logger = setup_logger(__name__)
 
+# 记录数达到该值时启用虚拟列表，只渲染可见行
+VIRTUAL_THRESHOLD = 200
+
+# 列表中问题文本的最大显示长度
+QUESTION_DISPLAY_LENGTH = 50
+
+# 过滤结果缓存的最大条目数
+FILTER_RESULT_CACHE_SIZE = 50
+
+# update_theme中用到的主题颜色
+THEME_COLOR_KEYS = ('card_bg', 'gray_1', 'bg_color', 'text_color', 'primary_alpha_20')
+
+
+@lru_cache(maxsize=1)
+def _date_boundaries(second):
+    """日期过滤的起始日期字符串，按秒缓存，同一秒内的多次过滤直接复用"""
+    now = datetime.fromtimestamp(second)
+    return {
+        "today": now.strftime("%Y-%m-%d"),
+        "week": (now - timedelta(days=7)).strftime("%Y-%m-%d"),
+        "month": (now - timedelta(days=30)).strftime("%Y-%m-%d"),
+    }
+
+
 class HistoryFrame(ctk.CTkFrame):
     """历史记录管理界面"""
     
@@ -41,16 +67,82 @@ class HistoryFrame(ctk.CTkFrame):
         self.current_records: List[HistoryRecord] = []
         self.selected_record: Optional[HistoryRecord] = None
         
+        # 延迟执行的过滤任务，连续输入时只在最后一次按键后过滤一次
+        self._search_after_id = None
+        
+        # 上一次过滤的条件和结果；关键词只是在原有基础上变长时，在上次结果中继续过滤
+        self._filter_cache = {"key": None, "keyword": None, "records": None}
+        
+        # 最近使用的过滤结果（LRU），切换回之前的过滤条件时直接复用
+        self._filter_results = OrderedDict()
+        
+        # 记录ID -> Treeview项目ID，过滤时复用已创建的行（不在结果中的行只是被分离）
+        self._tree_items = {}
+        
+        # 后台文件读写线程（导出等），结果通过after轮询回到主线程
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history_io")
+        
+        # 主应用程序实例，首次需要时查找
+        self._app_ref = None
+        
+        # 规范化记录ID（去掉下划线）-> 记录，每次加载历史记录时重建
+        self._record_by_id = {}
+        
+        # 虚拟列表模式：记录数较多时只渲染从_first_row开始的可见行
+        self._virtual = False
+        self._first_row = 0
+        # 当前已渲染的(起始行, 行数)，窗口未变化时跳过重新渲染
+        self._rendered_window = None
+        
+        # 上一次应用的主题颜色，update_theme只处理发生变化的颜色
+        self._theme_snapshot = {key: UI_SETTINGS['colors'][key] for key in THEME_COLOR_KEYS}
+        # ttk样式对象只创建一次，渲染时查询行高和update_theme设置Treeview样式都复用它
+        self._style = ttk.Style(self)
+        # Treeview的ttk样式在首次update_theme时才设置
+        self._treeview_styled = False
+        
+        # 过滤选项文本，过滤时直接比较，不再每次查询翻译
+        self.load_filter_texts()
+        
         # 配置网格布局
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         
+        # 界面组件和历史记录在选项卡首次显示时才创建和加载
+        self._initialized = False
+        self._map_bind_id = self.bind("<Map>", self._first_show)
+    
+    def _first_show(self, event=None):
+        """首次显示时创建界面组件并加载历史记录"""
+        if self._initialized:
+            return
+        self._initialized = True
+        self.unbind("<Map>", self._map_bind_id)
+        
         # 创建界面组件
         self.create_widgets()
         
+        # 应用Treeview样式（启动时的主题更新发生在组件创建之前）
+        self.update_theme()
+        
         # 加载历史记录
         self.refresh_records()
     
+    def load_filter_texts(self):
+        """缓存过滤选项的显示文本（语言变化后需重新调用）"""
+        self._text_all = t("history_filter_all")
+        self._text_today = t("history_filter_today")
+        self._text_week = t("history_filter_week")
+        self._text_month = t("history_filter_month")
+        self._text_custom = t("history_filter_custom")
+        
+        # 日期过滤选项 -> _date_boundaries中的起始日期键
+        self._date_filter_bounds = {
+            self._text_today: "today",
+            self._text_week: "week",
+            self._text_month: "month",
+        }
+    
     def create_widgets(self):
         """创建界面组件"""
         # 1. 搜索和过滤区域
@@ -100,12 +192,12 @@ class HistoryFrame(ctk.CTkFrame):
         
         self.method_combobox = ctk.CTkComboBox(
             search_frame,
-            values=[t("history_filter_all")] + DIVINATION_METHODS,
+            values=[self._text_all] + DIVINATION_METHODS,
             command=self.on_filter_changed,
             width=120,
             height=32
         )
-        self.method_combobox.set(t("history_filter_all"))
+        self.method_combobox.set(self._text_all)
         self.method_combobox.grid(row=0, column=3, padx=5, pady=10)
         
         # 日期范围过滤
@@ -118,14 +210,14 @@ class HistoryFrame(ctk.CTkFrame):
         
         self.date_combobox = ctk.CTkComboBox(
             search_frame,
-            values=[t("history_filter_all"), t("history_filter_today"), 
-                   t("history_filter_week"), t("history_filter_month"), 
-                   t("history_filter_custom")],
+            values=[self._text_all, self._text_today, 
+                   self._text_week, self._text_month, 
+                   self._text_custom],
             command=self.on_date_filter_changed,
             width=100,
             height=32
         )
-        self.date_combobox.set(t("history_filter_all"))
+        self.date_combobox.set(self._text_all)
         self.date_combobox.grid(row=0, column=5, padx=5, pady=10)
         
         # 刷新按钮
@@ -186,12 +278,17 @@ class HistoryFrame(ctk.CTkFrame):
         self.records_tree.bind("<<TreeviewSelect>>", self.on_record_selected)
         self.records_tree.bind("<Double-1>", self.on_record_double_click)
         
-        # 添加滚动条
-        tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.records_tree.yview)
-        self.records_tree.configure(yscrollcommand=tree_scrollbar.set)
+        # 添加滚动条（虚拟列表模式下滚动条对应全部记录，而非已渲染的行）
+        self.tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_scrollbar)
+        self.records_tree.configure(yscrollcommand=self._on_tree_yscroll)
+        
+        self.records_tree.bind("<MouseWheel>", self._on_tree_mousewheel)
+        self.records_tree.bind("<Button-4>", self._on_tree_mousewheel)
+        self.records_tree.bind("<Button-5>", self._on_tree_mousewheel)
+        self.records_tree.bind("<Configure>", self._on_tree_configure)
         
         self.records_tree.grid(row=0, column=0, sticky="nsew")
-        tree_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.tree_scrollbar.grid(row=0, column=1, sticky="ns")
     
     # 记录详情区域已移除
     
@@ -253,10 +350,25 @@ class HistoryFrame(ctk.CTkFrame):
         action_frame.grid_columnconfigure(1, weight=1)
     
     def refresh_records(self):
-        """刷新记录列表"""
+        """刷新记录列表（在后台线程中读取历史记录文件）"""
+        if not self._initialized:
+            # 尚未显示过，首次显示时会加载
+            return
+        self.stats_label.configure(text=t("history_stats_loading"))
+        self._run_in_background(self.history_manager.load_history, self._on_records_loaded)
+    
+    def _on_records_loaded(self, future):
+        """历史记录加载完成后在主线程中刷新列表"""
         try:
-            # 重新加载历史记录
-            self.history_manager.load_history()
+            future.result()
+            self._filter_cache = {"key": None, "keyword": None, "records": None}
+            self._filter_results.clear()
+            self._record_by_id = {r.norm_id: r for r in self.history_manager.records}
+            
+            # 记录可能已增删，丢弃缓存的行
+            if self._tree_items:
+                self.records_tree.delete(*self._tree_items.values())
+                self._tree_items = {}
             
             # 应用当前的搜索和过滤条件
             self.apply_filters()
@@ -282,54 +394,155 @@ class HistoryFrame(ctk.CTkFrame):
         if keyword:
             search_params["keyword"] = keyword
         
-        if method != t("history_filter_all"):
+        if method != self._text_all:
             search_params["divination_method"] = method
         
         # 处理日期过滤
-        if date_filter != t("history_filter_all"):
-            if date_filter == t("history_filter_today"):
-                start_date = datetime.now().strftime("%Y-%m-%d")
-                search_params["start_date"] = start_date
-            elif date_filter == t("history_filter_week"):
-                start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-                search_params["start_date"] = start_date
-            elif date_filter == t("history_filter_month"):
-                start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-                search_params["start_date"] = start_date
-        
-        # 执行搜索
-        self.current_records = self.history_manager.search_records(**search_params)
+        bound_key = self._date_filter_bounds.get(date_filter)
+        if bound_key:
+            search_params["start_date"] = _date_boundaries(int(time.time()))[bound_key]
+        
+        # 执行搜索：相同条件最近搜索过时直接复用结果
+        filter_key = (method, search_params.get("start_date"))
+        keyword_lower = keyword.lower()
+        result_key = (keyword_lower,) + filter_key
+        cached_result = self._filter_results.get(result_key)
+        cache = self._filter_cache
+        if cached_result is not None:
+            self._filter_results.move_to_end(result_key)
+            self.current_records = cached_result
+        # 起卦方式和日期条件不变且新关键词包含上次关键词时，
+        # 匹配结果必然是上次结果的子集，只需在上次结果中过滤
+        elif (cache["records"] is not None and cache["key"] == filter_key
+                and cache["keyword"] in keyword_lower):
+            if keyword_lower == cache["keyword"]:
+                self.current_records = cache["records"]
+            else:
+                self.current_records = [r for r in cache["records"]
+                                        if HistoryManager.matches_keyword(r, keyword_lower)]
+        else:
+            self.current_records = self.history_manager.search_records(**search_params)
+        self._filter_cache = {"key": filter_key, "keyword": keyword_lower, "records": self.current_records}
+        
+        if cached_result is None:
+            self._filter_results[result_key] = self.current_records
+            if len(self._filter_results) > FILTER_RESULT_CACHE_SIZE:
+                self._filter_results.popitem(last=False)
         
         # 更新列表显示
         self.update_records_display()
     
-    def update_records_display(self):
-        """更新记录列表显示"""
-        # 保存当前选择的记录ID
-        selected_id = None
-        if self.selected_record:
-            selected_id = self.selected_record.id
-        
-        # 清空现有项目
-        for item in self.records_tree.get_children():
-            self.records_tree.delete(item)
-        
-        # 添加记录
-        for record in self.current_records:
-            # 截断问题文本以适应显示
-            question_display = record.question[:50] + "..." if len(record.question) > 50 else record.question
+    def _get_tree_item(self, record):
+        """获取记录对应的Treeview行，首次出现时才创建"""
+        item_id = self._tree_items.get(record.id)
+        if item_id is None:
+            # 截断问题文本以适应显示（每条记录只在首次创建行时计算一次）
+            question = record.question
+            if len(question) > QUESTION_DISPLAY_LENGTH:
+                question = f"{question[:QUESTION_DISPLAY_LENGTH]}..."
             
             item_id = self.records_tree.insert("", "end", values=(
                 record.timestamp,
-                question_display,
+                question,
                 record.divination_method,
                 record.model
-            ), tags=(record.id,))
-            
-            # 如果这是之前选择的记录，重新选择它
-            if selected_id and str(record.id) == str(selected_id):
-                self.records_tree.selection_set(item_id)
-                self.records_tree.focus(item_id)
+            ), tags=(record.norm_id,))
+            self._tree_items[record.id] = item_id
+        return item_id
+    
+    def update_records_display(self):
+        """更新记录列表显示"""
+        # 保存当前选择的记录ID
+        selected_id = self.selected_record.norm_id if self.selected_record else None
+        selected_in_results = bool(selected_id) and any(
+            record.norm_id == selected_id for record in self.current_records)
+        
+        if len(self.current_records) >= VIRTUAL_THRESHOLD:
+            # 记录较多时只渲染可见窗口内的行
+            self._virtual = True
+            self._first_row = 0
+            self._rendered_window = None
+            self._render_window()
+        else:
+            self._virtual = False
+            # 一次性设置显示的行及其顺序，不在结果中的行被分离而非删除
+            self.records_tree.set_children("", *(self._get_tree_item(r) for r in self.current_records))
+        
+        if selected_in_results:
+            selected_item = self._tree_items.get(self.selected_record.id)
+            # 虚拟列表模式下选中的记录可能不在当前渲染的窗口内
+            if selected_item and (not self._virtual or selected_item in self.records_tree.get_children()):
+                self.records_tree.selection_set(selected_item)
+                self.records_tree.focus(selected_item)
+        elif self.records_tree.selection():
+            # 之前选择的记录已被过滤掉，取消选择
+            self.records_tree.selection_set(())
+    
+    def _visible_row_count(self):
+        """根据Treeview当前高度估算可见行数"""
+        rows = int(self.records_tree.cget("height"))
+        tree_height = self.records_tree.winfo_height()
+        if tree_height > 1:
+            row_height = int(self._style.lookup("Treeview", "rowheight") or 20)
+            # 扣除标题行高度
+            rows = max(rows, (tree_height - row_height) // row_height)
+        return rows
+    
+    def _render_window(self):
+        """虚拟列表模式下，只将可见窗口内的记录放入Treeview"""
+        total = len(self.current_records)
+        rows = self._visible_row_count()
+        first = max(0, min(self._first_row, total - rows))
+        self._first_row = first
+        
+        # 滚动到两端或尺寸未变时窗口不变，无需再经过Tcl重设行
+        if self._rendered_window == (first, rows):
+            return
+        self._rendered_window = (first, rows)
+        
+        window = self.current_records[first:first + rows]
+        self.records_tree.set_children("", *(self._get_tree_item(r) for r in window))
+        
+        if total:
+            self.tree_scrollbar.set(first / total, min(1.0, (first + rows) / total))
+        else:
+            self.tree_scrollbar.set(0.0, 1.0)
+    
+    def _on_scrollbar(self, *args):
+        """滚动条拖动/点击：虚拟列表模式下移动可见窗口，否则交给Treeview"""
+        if not self._virtual:
+            self.records_tree.yview(*args)
+            return
+        
+        total = len(self.current_records)
+        if args[0] == "moveto":
+            self._first_row = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = self._visible_row_count() if args[2] == "pages" else 1
+            self._first_row += int(args[1]) * step
+        self._render_window()
+    
+    def _on_tree_yscroll(self, first, last):
+        """Treeview自身滚动位置变化：虚拟列表模式下由_render_window更新滚动条"""
+        if not self._virtual:
+            self.tree_scrollbar.set(first, last)
+    
+    def _on_tree_mousewheel(self, event):
+        """虚拟列表模式下用鼠标滚轮移动可见窗口"""
+        if not self._virtual:
+            return None
+        
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._first_row -= 3
+        else:
+            self._first_row += 3
+        self._render_window()
+        return "break"
+    
+    def _on_tree_configure(self, event=None):
+        """Treeview尺寸变化时重新计算可见窗口"""
+        if self._virtual:
+            self._render_window()
     
     def update_statistics(self):
         """更新统计信息"""
@@ -344,20 +557,35 @@ class HistoryFrame(ctk.CTkFrame):
         
         self.stats_label.configure(text=stats_text)
     
+    def schedule_filters(self, delay=150):
+        """延迟应用过滤条件，期间的新请求会取消并重新计时"""
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(delay, self._run_scheduled_filters)
+    
+    def _run_scheduled_filters(self):
+        """执行延迟的过滤任务"""
+        self._search_after_id = None
+        self.apply_filters()
+    
     def on_search_changed(self, event=None):
         """搜索内容变化事件"""
-        self.apply_filters()
+        self.schedule_filters()
     
     def on_filter_changed(self, value=None):
         """过滤条件变化事件"""
-        self.apply_filters()
+        self.schedule_filters()
     
     def on_date_filter_changed(self, value=None):
         """日期过滤变化事件"""
         if value == "自定义":
             # 自定义日期范围功能暂未实现
             pass
-        self.apply_filters()
+        self.schedule_filters()
+    
+    def _find_record(self, record_id):
+        """根据Treeview标签中的ID查找记录（标签为规范化ID，纯数字时可能被Tcl转换为整数）"""
+        return self._record_by_id.get(str(record_id))
     
     def on_record_selected(self, event=None):
         """记录选择事件"""
@@ -368,27 +596,27 @@ class HistoryFrame(ctk.CTkFrame):
             
             if record_id:
                 # 查找对应的记录
-                found = False
-                for record in self.current_records:
-                    # 处理ID格式差异：移除下划线进行比较
-                    record_id_clean = str(record.id).replace('_', '')
-                    target_id_clean = str(record_id).replace('_', '')
-                    
-                    if record_id_clean == target_id_clean:
-                        self.selected_record = record
-                        logger.info(f"已选择记录: {record.id}")
-                        found = True
-                        break
-                
-                if not found:
-                    self.selected_record = None
-                    logger.warning(f"未找到ID为 {record_id} 的记录")
+                self.selected_record = self._find_record(record_id)
+                if self.selected_record is None:
+                    logger.warning("未找到ID为 %s 的记录", record_id)
+                elif logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("已选择记录: %s", self.selected_record.id)
             else:
                 self.selected_record = None
                 logger.warning("选择的项目没有有效的ID标签")
         else:
             self.selected_record = None
-            logger.info("取消选择记录")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("取消选择记录")
+    
+    def _get_app(self):
+        """向上查找主应用程序实例（含input_frame的祖先），找到后缓存"""
+        if self._app_ref is None:
+            app = self.master
+            while app and not hasattr(app, 'input_frame'):
+                app = app.master
+            self._app_ref = app
+        return self._app_ref
     
     def on_record_double_click(self, event=None):
         """记录双击事件 - 自动填写历史记录到主界面"""
@@ -402,22 +630,14 @@ class HistoryFrame(ctk.CTkFrame):
         record_id = item["tags"][0] if item["tags"] else None
         
         # 查找对应的记录
-        selected_record = None
-        for record in self.current_records:
-            # 处理ID格式差异：移除下划线进行比较
-            record_id_clean = str(record.id).replace('_', '')
-            target_id_clean = str(record_id).replace('_', '')
-            if record_id_clean == target_id_clean:
-                selected_record = record
-                break
+        selected_record = self._find_record(record_id) if record_id else None
                 
         if selected_record:
-            logger.info(f"自动填写历史记录: {selected_record.question[:30]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("自动填写历史记录: %s...", selected_record.question[:30])
             try:
                 # 获取主应用程序实例
-                app = self.master
-                while app and not hasattr(app, 'input_frame'):
-                    app = app.master
+                app = self._get_app()
                 
                 if app and hasattr(app, 'input_frame') and hasattr(app, 'notebook_frame'):
                     # 填写问题内容
@@ -451,18 +671,8 @@ class HistoryFrame(ctk.CTkFrame):
                     
                     # 加载聊天历史记录（如果有）
                     if hasattr(selected_record, 'chat_messages') and selected_record.chat_messages:
-                        # 恢复历史聊天记录（不使用打字机效果）
-                        for msg in selected_record.chat_messages:
-                            if 'message' in msg and 'is_user' in msg:
-                                app.notebook_frame.add_chat_bubble(
-                                    message=msg['message'],
-                                    is_user=msg['is_user'],
-                                    is_error=msg.get('is_error', False),
-                                    use_typing_effect=False  # 禁用打字机效果
-                                )
-                        
-                        # 添加历史记录分割线
-                        app.notebook_frame.add_history_divider()
+                        # 批量恢复历史聊天记录（不使用打字机效果）并添加历史记录分割线
+                        app.notebook_frame.add_chat_history(selected_record.chat_messages)
                         
                         # 设置标志，表示已加载历史记录
                         app.notebook_frame.is_first_chat_message = False
@@ -478,46 +688,6 @@ class HistoryFrame(ctk.CTkFrame):
             except Exception as e:
                 logger.error(f"自动填写历史记录时出错: {e}")
     
-    # 记录详情显示方法已移除
-    
-    def export_records(self):
-        """导出记录"""
-        if not self.current_records:
-            # 没有可导出的记录，记录到日志
-            logger.warning("没有可导出的记录")
-            return
-        
-        # 选择导出格式
-        format_dialog = ctk.CTkInputDialog(
-            text="选择导出格式 (json/csv):",
-            title="导出格式"
-        )
-        export_format = format_dialog.get_input()
-        
-        if not export_format or export_format.lower() not in ["json", "csv"]:
-            return
-        
-        # 选择保存位置
-        file_extension = export_format.lower()
-        filename = filedialog.asksaveasfilename(
-            title="保存导出文件",
-            defaultextension=f".{file_extension}",
-            filetypes=[(f"{file_extension.upper()} files", f"*.{file_extension}")]
-        )
-        
-        if filename:
-            try:
-                content = self.history_manager.export_records(self.current_records, export_format.lower())
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                # 导出成功，记录到日志
-                logger.info(f"已导出 {len(self.current_records)} 条记录到 {filename}")
-                logger.info(f"导出 {len(self.current_records)} 条记录到 {filename}")
-            except Exception as e:
-                logger.error(f"导出记录失败: {e}")
-                # 导出失败，已记录到日志
-    
     def delete_selected_record(self):
         """删除选中的记录"""
         if not self.selected_record:
@@ -563,17 +733,37 @@ class HistoryFrame(ctk.CTkFrame):
         )
         
         if filename:
-            try:
-                content = self.history_manager.export_records(self.current_records, export_format.lower())
+            records = list(self.current_records)
+            export_format = export_format.lower()
+            
+            def write_export():
+                # 逐条写入文件，不在内存中拼出完整导出内容
                 with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                # 导出成功，记录到日志
-                logger.info(f"已导出 {len(self.current_records)} 条记录到 {filename}")
-                logger.info(f"导出 {len(self.current_records)} 条记录到 {filename}")
-            except Exception as e:
-                logger.error(f"导出记录失败: {e}")
-                # 导出失败，已记录到日志
+                    for chunk in self.history_manager.iter_export(records, export_format):
+                        f.write(chunk)
+            
+            def on_export_done(future):
+                try:
+                    future.result()
+                    # 导出成功，记录到日志
+                    logger.info(f"已导出 {len(records)} 条记录到 {filename}")
+                except Exception as e:
+                    logger.error(f"导出记录失败: {e}")
+                    # 导出失败，已记录到日志
+            
+            self._run_in_background(write_export, on_export_done)
+    
+    def _run_in_background(self, func, on_done):
+        """在后台线程中执行func，完成后在主线程中以Future调用on_done"""
+        future = self._io_pool.submit(func)
+        
+        def poll():
+            if future.done():
+                on_done(future)
+            else:
+                self.after(50, poll)
+        
+        self.after(50, poll)
     
     def clear_all_records(self):
         """清空所有历史记录"""
@@ -590,60 +780,65 @@ class HistoryFrame(ctk.CTkFrame):
 
     
     def update_theme(self):
-        """更新主题颜色"""
+        """更新主题颜色，只重新配置颜色实际发生变化的组件"""
         try:
             from config.ui_config import get_ui_settings
             # 更新UI设置
             ui_settings = get_ui_settings()
             colors = ui_settings['colors']
             
+            previous = self._theme_snapshot
+            changed = {key for key in THEME_COLOR_KEYS if previous.get(key) != colors[key]}
+            if not changed and self._treeview_styled:
+                logger.debug("HistoryFrame主题颜色未变化，跳过更新")
+                return
+            self._theme_snapshot = {key: colors[key] for key in THEME_COLOR_KEYS}
+            
             # 更新主框架背景色
-            self.configure(fg_color=colors['card_bg'])
+            if 'card_bg' in changed:
+                self.configure(fg_color=colors['card_bg'])
             
             # 更新所有子框架的背景色
             for child in self.winfo_children():
                 if isinstance(child, ctk.CTkFrame):
-                    # 检查是否是搜索框架或操作框架（使用gray_1背景）
-                    if hasattr(child, '_fg_color') and child._fg_color == UI_SETTINGS['colors']['gray_1']:
-                        child.configure(fg_color=colors['gray_1'])
-                    else:
+                    # 检查是否是搜索框架或操作框架（使用上一主题的gray_1背景）
+                    if getattr(child, '_fg_color', None) == previous.get('gray_1'):
+                        if 'gray_1' in changed:
+                            child.configure(fg_color=colors['gray_1'])
+                    elif 'card_bg' in changed:
                         child.configure(fg_color=colors['card_bg'])
             
+            # 输入框、下拉框和详情文本框的颜色，只包含变化的项
+            entry_opts = {}
+            if 'bg_color' in changed:
+                entry_opts['fg_color'] = colors['bg_color']
+            if 'text_color' in changed:
+                entry_opts['text_color'] = colors['text_color']
+            
+            combobox_opts = dict(entry_opts)
+            if 'card_bg' in changed:
+                combobox_opts['dropdown_fg_color'] = colors['card_bg']
+            if 'text_color' in changed:
+                combobox_opts['dropdown_text_color'] = colors['text_color']
+            
             # 更新搜索输入框
-            if hasattr(self, 'search_entry'):
-                self.search_entry.configure(
-                    fg_color=colors['bg_color'],
-                    text_color=colors['text_color']
-                )
+            if entry_opts and hasattr(self, 'search_entry'):
+                self.search_entry.configure(**entry_opts)
             
             # 更新下拉框
-            if hasattr(self, 'method_combobox'):
-                self.method_combobox.configure(
-                    fg_color=colors['bg_color'],
-                    text_color=colors['text_color'],
-                    dropdown_fg_color=colors['card_bg'],
-                    dropdown_text_color=colors['text_color']
-                )
-            
-            if hasattr(self, 'date_combobox'):
-                self.date_combobox.configure(
-                    fg_color=colors['bg_color'],
-                    text_color=colors['text_color'],
-                    dropdown_fg_color=colors['card_bg'],
-                    dropdown_text_color=colors['text_color']
-                )
+            if combobox_opts:
+                for combobox_name in ('method_combobox', 'date_combobox'):
+                    if hasattr(self, combobox_name):
+                        getattr(self, combobox_name).configure(**combobox_opts)
             
             # 更新详情文本框
-            if hasattr(self, 'detail_text'):
-                self.detail_text.configure(
-                    fg_color=colors['bg_color'],
-                    text_color=colors['text_color']
-                )
+            if entry_opts and hasattr(self, 'detail_text'):
+                self.detail_text.configure(**entry_opts)
             
             # 更新Treeview样式（需要通过ttk.Style）
             if hasattr(self, 'records_tree'):
                 try:
-                    style = ttk.Style()
+                    style = self._style
                     style.theme_use('clam')  # 使用clam主题以支持更多自定义
                     
                     # 设置Treeview的背景色和前景色
@@ -664,6 +859,7 @@ class HistoryFrame(ctk.CTkFrame):
                     style.map('Treeview',
                              background=[('selected', colors['primary_alpha_20'])],
                              foreground=[('selected', colors['text_color'])])
+                    self._treeview_styled = True
                     
                 except Exception as e:
                     logger.warning(f"更新Treeview样式时出错: {e}")
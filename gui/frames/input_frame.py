@@ -1,36 +1,77 @@
+from tkinter import ttk
+
 import customtkinter as ctk
 
 from config.languages import t
 from config.settings import DEFAULT_MODEL
 from config.ui_config import get_ui_settings
+from utils.config_manager import config_manager
 from utils.logger import setup_logger
 from utils.ui import IOSEntry
 
 # 设置日志记录器
 logger = setup_logger(__name__)
 
+# 起卦方式下拉框使用的ttk样式名
+COMBOBOX_STYLE = "Divination.TCombobox"
+
+# 按钮主题角色 -> (背景色键, 悬停色键)
+BUTTON_THEME_ROLES = {
+    'primary': ('primary_color', 'primary_alpha_20'),
+    'gray': ('gray_3', 'gray_4'),
+    'secondary': ('secondary_color', 'secondary_alpha_20'),
+}
+
 class InputFrame(ctk.CTkFrame):
     """应用程序输入区域，包含问题输入、起卦方式和模型选择"""
     
     def __init__(self, master, command=None, **kwargs):
         # 获取UI设置
-        self.ui_settings = get_ui_settings()
+        self.ui_settings = ui = get_ui_settings()
         
         super().__init__(
             master, 
-            corner_radius=self.ui_settings['component']['card_corner_radius'],
-            fg_color=self.ui_settings['colors']['card_bg'],
+            corner_radius=ui['component']['card_corner_radius'],
+            fg_color=ui['colors']['card_bg'],
             **kwargs
         )
         
         # 保存父组件引用
         self.parent = master
         
+        # 主应用程序实例和设置页面，首次找到后缓存
+        self._app_ref = None
+        self._settings_frame = None
+        
         # 保存回调函数
-        self.command = command if command else lambda: None
+        self.command = command
+        
+        # 用神和分析方面输入区域延迟到首次使用时创建
+        self.yongshen_label = None
+        self.yongshen_entry = None
+        self.fangmian_label = None
+        self.fangmian_entry = None
+        # 高级选项是否展开；收起时用神和分析方面不参与分析
+        self._advanced_visible = False
+        
+        # 分析/清空按钮的目标状态，及尚未执行的状态应用任务
+        self._buttons_state = "normal"
+        self._buttons_state_job = None
         
-        # 配置网格布局
-        self.grid_columnconfigure(0, weight=1)
+        # 需要随主题更新的输入框和按钮（按钮附带主题角色），在创建组件时登记
+        self._themed_entries = []
+        self._themed_buttons = []
+        
+        # 配置网格布局：0问题 1用神 2分析方面 3起卦方式 4按钮
+        # 标签和输入框直接放在本框架中，第1列（输入框）可扩展
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(4, weight=0)
+        
+        # 按字号预先创建字体，各组件共享同一字体对象
+        self._fonts = {
+            size: ctk.CTkFont(family=ui['font_family'], size=size)
+            for size in (12, 14)
+        }
         
         # 创建输入区域组件
         self.create_widgets()
@@ -38,8 +79,6 @@ class InputFrame(ctk.CTkFrame):
     def create_widgets(self):
         """创建输入区域的组件"""
         try:
-            logger.info("开始创建InputFrame组件")
-            
             # 1. 问题输入区域
             self.create_question_input()
             
@@ -49,7 +88,7 @@ class InputFrame(ctk.CTkFrame):
             # 3. 按钮区域
             self.create_button_area()
             
-            logger.info("InputFrame组件创建完成")
+            logger.debug("InputFrame组件创建完成")
             
         except Exception as e:
             logger.error(f"创建InputFrame组件时出错: {e}")
@@ -58,109 +97,123 @@ class InputFrame(ctk.CTkFrame):
     def create_question_input(self):
         """创建问题输入区域"""
         try:
-            # 问题输入区域框架 - 水平排列
-            question_frame = ctk.CTkFrame(self, fg_color="transparent")
-            question_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 10))
-            question_frame.grid_columnconfigure(1, weight=1)  # 让输入框可以扩展
-            
             # 问题输入标签
             self.question_label = ctk.CTkLabel(
-                question_frame,
+                self,
                 text=t("input_question_label"),
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=14
-                ),
+                font=self._fonts[14],
                 anchor="w",
                 width=120
             )
-            self.question_label.grid(row=0, column=0, sticky="w", padx=(0, 10), pady=0)
+            self.question_label.grid(row=0, column=0, sticky="w", padx=10, pady=(10, 10))
             
             # 问题输入框 - 调整高度和宽度
             self.question_entry = IOSEntry(
-                question_frame,
+                self,
                 placeholder=t("input_question_placeholder"),
                 height=40,  # 降低高度
                 width=600  # 增加宽度
             )
-            self.question_entry.grid(row=0, column=1, sticky="ew", padx=0, pady=0)
-
-            # 用神输入区域框架
-            yongshen_frame = ctk.CTkFrame(self, fg_color="transparent")
-            yongshen_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
-            yongshen_frame.grid_columnconfigure(1, weight=1)  # 让输入框可以扩展
-
-            # 用神输入标签
-            self.yongshen_label = ctk.CTkLabel(
-                yongshen_frame,
-                text="用神",
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=14
-                ),
-                anchor="w",
-                width=120
-            )
-            self.yongshen_label.grid(row=0, column=0, sticky="w", padx=(0, 10), pady=0)
-
-            # 用神输入框
-            self.yongshen_entry = IOSEntry(
-                yongshen_frame,
-                placeholder="请输入用神，例如：五爻子孙。或留空让AI自动判断用神。",
-                height=40,
-                width=600
-            )
-            self.yongshen_entry.grid(row=0, column=1, sticky="ew", padx=0, pady=0)
-
-            # 方面输入区域框架
-            fangmian_frame = ctk.CTkFrame(self, fg_color="transparent")
-            fangmian_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
-            fangmian_frame.grid_columnconfigure(1, weight=1)  # 让输入框可以扩展
-
-            # 用神输入标签
-            self.fangmian_label = ctk.CTkLabel(
-                fangmian_frame,
-                text="分析方面",
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=14
-                ),
-                anchor="w",
-                width=120
-            )
-            self.fangmian_label.grid(row=0, column=0, sticky="w", padx=(0, 10), pady=0)
+            self.question_entry.grid(row=0, column=1, sticky="ew", padx=0, pady=(10, 10))
+            self._themed_entries.append(self.question_entry)
+            self.question_entry.entry.bind("<Return>", self._on_entry_return)
 
-            # 用神输入框
-            self.fangmian_entry = IOSEntry(
-                fangmian_frame,
-                placeholder="请输入分析方面，用“ ”分割。或留空让AI自动判断方面。",
-                height=40,
-                width=600
+            # 高级选项按钮：用神和分析方面输入框在首次展开时才创建
+            self.advanced_button = ctk.CTkButton(
+                self,
+                text=t("input_advanced_options"),
+                command=self.toggle_advanced_options,
+                width=80,
+                height=35,
+                font=self._fonts[12],
+                corner_radius=8,
+                fg_color="transparent",
+                border_width=1,
+                border_color=self.ui_settings['colors']['primary_color'],
+                text_color=self.ui_settings['colors']['primary_color'],
+                hover_color=self.ui_settings['colors']['primary_alpha_20']
             )
-            self.fangmian_entry.grid(row=0, column=1, sticky="ew", padx=0, pady=0)
-            
-            logger.info("问题输入区域创建成功")
+            self.advanced_button.grid(row=0, column=2, sticky="e", padx=10, pady=(10, 10))
             
         except Exception as e:
             logger.error(f"创建问题输入区域时出错: {e}")
             raise
     
+    def _create_optional_input(self, row, label_text, placeholder):
+        """创建一行带标签的可选输入框（用神/分析方面），返回(标签, 输入框)"""
+        label = ctk.CTkLabel(
+            self,
+            text=label_text,
+            font=self._fonts[14],
+            anchor="w",
+            width=120
+        )
+        label.grid(row=row, column=0, sticky="w", padx=10, pady=(0, 10))
+        
+        entry = IOSEntry(
+            self,
+            placeholder=placeholder,
+            height=40,
+            width=600
+        )
+        entry.grid(row=row, column=1, columnspan=2, sticky="ew", padx=(0, 10), pady=(0, 10))
+        self._themed_entries.append(entry)
+        entry.entry.bind("<Return>", self._on_entry_return)
+        return label, entry
+    
+    def _ensure_yongshen(self):
+        """首次需要时创建用神输入区域"""
+        if self.yongshen_entry is None:
+            self.yongshen_label, self.yongshen_entry = self._create_optional_input(
+                1, "用神", "请输入用神，例如：五爻子孙。或留空让AI自动判断用神。")
+            logger.debug("用神输入区域已创建")
+        return self.yongshen_entry
+    
+    def _ensure_fangmian(self):
+        """首次需要时创建分析方面输入区域"""
+        if self.fangmian_entry is None:
+            self.fangmian_label, self.fangmian_entry = self._create_optional_input(
+                2, "分析方面", "请输入分析方面，用“ ”分割。或留空让AI自动判断方面。")
+            logger.debug("分析方面输入区域已创建")
+        return self.fangmian_entry
+    
+    def toggle_advanced_options(self):
+        """展开/收起用神和分析方面输入区域"""
+        try:
+            if self._advanced_visible:
+                for widget in self._optional_widgets():
+                    widget.grid_remove()
+                self._advanced_visible = False
+            else:
+                self._show_advanced_options()
+        except Exception as e:
+            logger.error(f"切换高级选项时出错: {e}")
+    
+    def _show_advanced_options(self):
+        """确保用神和分析方面输入区域已创建并显示"""
+        self._ensure_yongshen()
+        self._ensure_fangmian()
+        for widget in self._optional_widgets():
+            widget.grid()
+        self._advanced_visible = True
+    
+    def _optional_widgets(self):
+        """已创建的用神和分析方面标签及输入框"""
+        return (self.yongshen_label, self.yongshen_entry, self.fangmian_label, self.fangmian_entry)
+    
     def create_divination_selection(self):
         """创建起卦方式选择区域"""
         try:
             # 起卦方式区域框架 - 水平排列
             divination_frame = ctk.CTkFrame(self, fg_color="transparent")
-            divination_frame.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 10))
+            divination_frame.grid(row=3, column=0, columnspan=3, sticky="ew", padx=10, pady=(0, 10))
             divination_frame.grid_columnconfigure(1, weight=1)  # 让下拉框可以扩展
             
             # 起卦方式标签
             self.divination_label = ctk.CTkLabel(
                 divination_frame,
                 text=t("input_divination_label"),
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=14
-                ),
+                font=self._fonts[14],
                 anchor="w",
                 width=120
             )
@@ -171,105 +224,78 @@ class InputFrame(ctk.CTkFrame):
                 t("divination_liuyao"),
                 t("divination_qimen"),
             ]
-            self.divination_combobox = ctk.CTkComboBox(
+            # 固定的两个选项，使用原生ttk下拉框，创建和重绘开销远小于画布绘制的CTkComboBox
+            self._apply_combobox_style(self.ui_settings['colors'])
+            self.divination_combobox = ttk.Combobox(
                 divination_frame,
                 values=divination_methods,
                 state="readonly",
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=12
-                ),
-                height=35,
-                width=200
+                font=self._fonts[12],
+                style=COMBOBOX_STYLE,
+                width=20
             )
             self.divination_combobox.set(divination_methods[0])
             self.divination_combobox.grid(row=0, column=1, sticky="w", padx=0, pady=0)
             
-            logger.info("起卦方式选择区域创建成功")
-            
         except Exception as e:
             logger.error(f"创建起卦方式选择区域时出错: {e}")
             raise
     
-
+    def _apply_combobox_style(self, colors):
+        """按主题颜色设置起卦方式下拉框的ttk样式"""
+        try:
+            style = ttk.Style()
+            style.configure(COMBOBOX_STYLE,
+                            fieldbackground=colors['bg_color'],
+                            background=colors['bg_color'],
+                            foreground=colors['text_color'],
+                            arrowcolor=colors['text_color'])
+            style.map(COMBOBOX_STYLE,
+                      fieldbackground=[('readonly', colors['bg_color'])],
+                      foreground=[('readonly', colors['text_color'])])
+            
+            # 下拉列表是普通Listbox，通过选项数据库设置颜色
+            self.option_add('*TCombobox*Listbox.background', colors['card_bg'])
+            self.option_add('*TCombobox*Listbox.foreground', colors['text_color'])
+        except Exception as e:
+            logger.warning(f"更新下拉框样式时出错: {e}")
     
     def create_button_area(self):
         """创建按钮区域"""
         try:
             # 按钮容器框架 - 修复按钮布局和边框问题
             button_frame = ctk.CTkFrame(self, fg_color="transparent")
-            button_frame.grid(row=3, column=0, sticky="ew", padx=10, pady=(10, 20))
+            button_frame.grid(row=4, column=0, columnspan=3, sticky="ew", padx=10, pady=(10, 20))
             
             # 配置按钮框架的网格布局，确保按钮居中
             button_frame.grid_columnconfigure((0, 1, 2), weight=1)
             
-            # 分析按钮 - 修复配色为蓝色
-            self.analyze_button = ctk.CTkButton(
-                button_frame,
-                text=t("btn_analyze"),
-                command=self.on_analyze_click,
+            # 三个按钮共用的参数 - 创建时均使用蓝色主题色
+            common = dict(
                 width=100,
                 height=35,
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=12
-                ),
+                font=self._fonts[12],
                 corner_radius=8,
-                fg_color=self.ui_settings['colors']['primary_color'],  # 蓝色主题色
-                hover_color=self.ui_settings['colors']['primary_alpha_20']  # 蓝色悬停色
+                fg_color=self.ui_settings['colors']['primary_color'],
+                hover_color=self.ui_settings['colors']['primary_alpha_20']
             )
-            self.analyze_button.grid(row=0, column=0, padx=5, pady=5)
             
-            # 清空按钮 - 修复配色为蓝色
-            self.clear_button = ctk.CTkButton(
-                button_frame,
-                text=t("btn_clear"),
-                command=self.on_clear_click,
-                width=100,
-                height=35,
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=12
-                ),
-                corner_radius=8,
-                fg_color=self.ui_settings['colors']['primary_color'],  # 蓝色主题色
-                hover_color=self.ui_settings['colors']['primary_alpha_20']  # 蓝色悬停色
-            )
-            self.clear_button.grid(row=0, column=1, padx=5, pady=5)
-            
-            # 导出按钮 - 修复配色为蓝色
-            self.export_button = ctk.CTkButton(
-                button_frame,
-                text=t("btn_export"),
-                command=self.on_export_click,
-                width=100,
-                height=35,
-                font=ctk.CTkFont(
-                    family=self.ui_settings['font_family'],
-                    size=12
-                ),
-                corner_radius=8,
-                fg_color=self.ui_settings['colors']['primary_color'],  # 蓝色主题色
-                hover_color=self.ui_settings['colors']['primary_alpha_20'],  # 蓝色悬停色
-                state="disabled"
-            )
-            self.export_button.grid(row=0, column=2, padx=5, pady=5)
-            
-            logger.info("按钮区域创建成功")
+            # (属性名, 文本键, 回调, 初始状态, 主题角色)
+            button_specs = [
+                ('analyze_button', 'btn_analyze', self.on_analyze_click, 'normal', 'primary'),
+                ('clear_button', 'btn_clear', self.on_clear_click, 'normal', 'gray'),
+                ('export_button', 'btn_export', self.on_export_click, 'disabled', 'secondary'),
+            ]
+            for column, (attr, text_key, command, state, role) in enumerate(button_specs):
+                button = ctk.CTkButton(button_frame, text=t(text_key), command=command, state=state, **common)
+                button.grid(row=0, column=column, padx=5, pady=5)
+                setattr(self, attr, button)
+                self._themed_buttons.append((button, role))
             
         except Exception as e:
             logger.error(f"创建按钮区域时出错: {e}")
             raise
     
-    def on_divination_changed(self):
-        """起卦方式改变时的回调函数"""
-        try:
-            selected_method = self.divination_combobox.get()
-            logger.info(f"起卦方式已更改为: {selected_method}")
-            
-        except Exception as e:
-            logger.error(f"处理起卦方式改变时出错: {e}")
-    
     def on_analyze_click(self):
         """分析按钮点击事件"""
         try:
@@ -283,13 +309,19 @@ class InputFrame(ctk.CTkFrame):
             
             logger.info(f"开始分析 - 问题: {question[:50]}..., 方式: {divination_method}, 模型: {model}")
             
-            # 调用回调函数
-            if self.command:
+            # 调用回调函数（未提供时为None）
+            if self.command is not None:
                 self.command()
             
         except Exception as e:
             logger.error(f"处理分析按钮点击时出错: {e}")
     
+    def _on_entry_return(self, event=None):
+        """在输入框中按回车键时开始分析（分析进行中按钮被禁用时忽略）"""
+        if self._buttons_state != "disabled":
+            self.on_analyze_click()
+        return "break"
+    
     def on_clear_click(self):
         """清空按钮点击事件"""
         try:
@@ -306,16 +338,13 @@ class InputFrame(ctk.CTkFrame):
         """导出按钮点击事件"""
         try:
             # 获取主应用程序实例
-            app = self.master
-            while app and not hasattr(app, 'notebook_frame'):
-                app = app.master
-            
-            if not app or not hasattr(app, 'notebook_frame'):
+            app = self._get_app()
+            if not app:
                 logger.error("无法找到主应用程序实例")
                 return
             
             # 检查是否有分析结果
-            result_text = app.notebook_frame.result_text.get(1.0, "end-1c").strip()
+            result_text = app.notebook_frame.get_result_text().strip()
             if not result_text:
                 # 没有可导出的分析结果，记录到日志
                 logger.warning("没有可导出的分析结果")
@@ -327,43 +356,58 @@ class InputFrame(ctk.CTkFrame):
         except Exception as e:
             logger.error(f"导出时出错: {e}")
     
+    def _get_app(self):
+        """向上查找主应用程序实例（含notebook_frame的祖先），找到后缓存"""
+        if self._app_ref is None:
+            app = self.master
+            while app and not hasattr(app, 'notebook_frame'):
+                app = app.master
+            self._app_ref = app
+        return self._app_ref
+    
+    def _get_settings_frame(self):
+        """获取设置页面（模型选择在其中管理），找到后缓存；设置页面尚未创建时返回None"""
+        if self._settings_frame is None:
+            notebook_frame = getattr(self.parent, 'notebook_frame', None)
+            if notebook_frame is not None:
+                self._settings_frame = notebook_frame.get_settings_frame()
+        return self._settings_frame
+    
     def get_question(self):
         """获取问题内容"""
-        try:
-            return self.question_entry.get()
-        except Exception as e:
-            logger.error(f"获取问题内容时出错: {e}")
-            return ""
+        return self.question_entry.get()
 
     def get_yongshen(self):
-        """获取用神内容"""
-        try:
-            return self.yongshen_entry.get()
-        except Exception as e:
-            logger.error(f"获取用神内容时出错: {e}")
+        """获取用神内容（高级选项未展开时为空，收起的内容不参与分析）"""
+        if not self._advanced_visible:
             return ""
+        return self.yongshen_entry.get()
 
     def set_yongshen(self, yongshen):
         """设置用神内容"""
         try:
+            if self.yongshen_entry is None and not yongshen:
+                return
+            if yongshen and not self._advanced_visible:
+                self._show_advanced_options()
             self.yongshen_entry.set(yongshen)
-            logger.info(f"设置用神内容: {yongshen}")
         except Exception as e:
             logger.error(f"设置用神内容时出错: {e}")
 
     def get_fangmian(self):
-        """获取方面内容"""
-        try:
-            return self.fangmian_entry.get()
-        except Exception as e:
-            logger.error(f"获取方面内容时出错: {e}")
+        """获取方面内容（高级选项未展开时为空，收起的内容不参与分析）"""
+        if not self._advanced_visible:
             return ""
+        return self.fangmian_entry.get()
 
     def set_fangmian(self, fangmian):
         """设置方面内容"""
         try:
+            if self.fangmian_entry is None and not fangmian:
+                return
+            if fangmian and not self._advanced_visible:
+                self._show_advanced_options()
             self.fangmian_entry.set(fangmian)
-            logger.info(f"设置方面内容: {fangmian}")
         except Exception as e:
             logger.error(f"设置方面内容时出错: {e}")
 
@@ -371,19 +415,12 @@ class InputFrame(ctk.CTkFrame):
         """设置问题内容"""
         try:
             self.question_entry.set(question)
-            logger.info(f"设置问题内容: {question}")
         except Exception as e:
             logger.error(f"设置问题内容时出错: {e}")
     
     def get_divination_method(self):
-        """获取起卦方式"""
+        """获取起卦方式（目前固定为六爻）"""
         return "六爻"
-
-        try:
-            return self.divination_combobox.get()
-        except Exception as e:
-            logger.error(f"获取起卦方式时出错: {e}")
-            return "六爻"
     
     def set_divination_method(self, method):
         """设置起卦方式"""
@@ -395,10 +432,11 @@ class InputFrame(ctk.CTkFrame):
     def get_model(self):
         """获取选择的模型"""
         try:
-            # 从设置页面获取默认模型
-            if hasattr(self.parent, 'notebook_frame') and hasattr(self.parent.notebook_frame, 'settings_frame'):
-                return self.parent.notebook_frame.settings_frame.get_default_model()
-            return DEFAULT_MODEL
+            # 从设置页面获取默认模型；设置页面尚未创建时使用配置文件中的默认模型
+            settings_frame = self._get_settings_frame()
+            if settings_frame:
+                return settings_frame.get_default_model()
+            return config_manager.get('default_model', DEFAULT_MODEL)
         except Exception as e:
             logger.error(f"获取模型时出错: {e}")
             return DEFAULT_MODEL
@@ -407,8 +445,11 @@ class InputFrame(ctk.CTkFrame):
         """设置模型"""
         try:
             # 模型选择现在在设置页面管理
-            if hasattr(self.parent, 'notebook_frame') and hasattr(self.parent.notebook_frame, 'settings_frame'):
-                self.parent.notebook_frame.settings_frame.set_default_model(model)
+            settings_frame = self._get_settings_frame()
+            if settings_frame:
+                settings_frame.set_default_model(model)
+            else:
+                config_manager.set('default_model', model)
         except Exception as e:
             logger.error(f"设置模型时出错: {e}")
     
@@ -416,17 +457,30 @@ class InputFrame(ctk.CTkFrame):
         """更新模型列表"""
         try:
             # 模型列表现在在设置页面管理
-            if hasattr(self.parent, 'notebook_frame') and hasattr(self.parent.notebook_frame, 'settings_frame'):
-                self.parent.notebook_frame.settings_frame.refresh_model_list()
+            settings_frame = self._get_settings_frame()
+            if settings_frame:
+                settings_frame.refresh_model_list()
             logger.info("模型列表更新请求已发送到设置页面")
         except Exception as e:
             logger.error(f"更新模型列表时出错: {e}")
     
     def set_buttons_state(self, state):
-        """设置按钮状态"""
+        """设置按钮状态
+        
+        状态在空闲时统一应用，同一轮事件中的多次调用只生效最后一次。
+        """
+        self._buttons_state = state
+        if self._buttons_state_job is None:
+            self._buttons_state_job = self.after_idle(self._apply_buttons_state)
+    
+    def _apply_buttons_state(self):
+        """应用待设置的按钮状态，只重绘状态实际变化的按钮"""
+        self._buttons_state_job = None
         try:
-            self.analyze_button.configure(state=state)
-            self.clear_button.configure(state=state)
+            state = self._buttons_state
+            for button in (self.analyze_button, self.clear_button):
+                if button.cget("state") != state:
+                    button.configure(state=state)
             
         except Exception as e:
             logger.error(f"设置按钮状态时出错: {e}")
@@ -451,47 +505,32 @@ class InputFrame(ctk.CTkFrame):
             # 更新frame背景色
             self.configure(fg_color=colors['card_bg'])
             
-            # 更新所有子组件的颜色
-            # 问题输入框
-            if hasattr(self, 'question_entry') and hasattr(self.question_entry, 'update_theme'):
-                self.question_entry.update_theme()
-            # 用神输入框
-            if hasattr(self, 'yongshen_entry') and hasattr(self.yongshen_entry, 'update_theme'):
-                self.yongshen_entry.update_theme()
-            # 方面输入框
-            if hasattr(self, 'fangmian_entry') and hasattr(self.fangmian_entry, 'update_theme'):
-                self.fangmian_entry.update_theme()
-            
-            # 起卦方式选择框 (customtkinter组件)
-            if hasattr(self, 'divination_combobox'):
-                self.divination_combobox.configure(
-                    fg_color=colors['bg_color'],
-                    text_color=colors['text_color'],
-                    dropdown_fg_color=colors['card_bg'],
-                    dropdown_text_color=colors['text_color']
-                )
+            # 字体族变化时直接修改共享字体，使用该字体的组件随之更新
+            font_family = self.ui_settings['font_family']
+            for font in self._fonts.values():
+                if font.cget('family') != font_family:
+                    font.configure(family=font_family)
+            
+            # 更新所有输入框（包括已创建的用神/分析方面输入框）
+            for entry in self._themed_entries:
+                entry.update_theme()
+            
+            # 起卦方式选择框 (ttk组件，通过样式更新)
+            self._apply_combobox_style(colors)
             
             # 模型选择现在在设置页面管理
             
             # 按钮组
-            if hasattr(self, 'analyze_button'):
-                self.analyze_button.configure(
-                    fg_color=colors['primary_color'],
-                    hover_color=colors['primary_alpha_20']
-                )
-            
-            if hasattr(self, 'clear_button'):
-                self.clear_button.configure(
-                    fg_color=colors['gray_3'],
-                    hover_color=colors['gray_4']
-                )
-            
-            if hasattr(self, 'export_button'):
-                self.export_button.configure(
-                    fg_color=colors['secondary_color'],
-                    hover_color=colors['secondary_alpha_20']
-                )
-                
+            for button, role in self._themed_buttons:
+                fg_key, hover_key = BUTTON_THEME_ROLES[role]
+                button.configure(fg_color=colors[fg_key], hover_color=colors[hover_key])
+            
+            self.advanced_button.configure(
+                border_color=colors['primary_color'],
+                text_color=colors['primary_color'],
+                hover_color=colors['primary_alpha_20']
+            )
+            
             logger.debug("InputFrame主题已更新")
         except Exception as e:
             logger.error(f"更新InputFrame主题时出错: {e}")
\ No newline at end of file
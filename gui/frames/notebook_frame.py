@@ -1,7 +1,10 @@
 # gui/frames/notebook_frame.py
 
+import re
 import tkinter as tk
-from tkinter import scrolledtext
+from contextlib import contextmanager
+from functools import lru_cache
+from tkinter import ttk
 
 import customtkinter as ctk
 
@@ -10,14 +13,230 @@ from config.settings import DEFAULT_MODEL, SUPPORTED_MODELS
 from config.ui_config import UI_SETTINGS
 from utils.animation import typing_animation
 from utils.logger import setup_logger
+from utils.ui import create_rounded_rectangle
 from .history_frame import HistoryFrame
 
 logger = setup_logger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _font(family, size, weight="normal"):
+    """按(字体, 字号, 粗细)复用CTkFont对象，避免每个组件/每条消息都新建字体"""
+    return ctk.CTkFont(family=family, size=size, weight=weight)
+
+
+# 解读结果格式化用到的正则表达式（预编译，逐行匹配时不再查找模式缓存）
+_TITLE_BRACKET = re.compile(r'^【[^】]*】$')  # 【用神判断】
+_TITLE_NUM = re.compile(r'^(\d+、[^：:]*[：:])(.*)$')  # 1、当前财务状况：...
+_TITLE_BOLD = re.compile(r'^\*\*.*\*\*$')  # **事业运势**
+_TITLE_CONCLUSION = re.compile(r'^结论[：:]')  # 结论：...
+_TITLE_REFERENCE = re.compile(r'^参考文件[：:]')  # 参考文件：
+_SPLIT_BRACKETS = re.compile(r'(（[^）]*）|\[[^\]]*\])')  # （说明）或[说明]
+
+# 解读结果文本标签的样式：foreground为主题颜色键，font中的None表示界面字体
+RESULT_TAG_STYLES = (
+    ('main_text', {'foreground': 'text_color'}),
+    ('explanation', {'foreground': 'gray_5'}),  # 括号内容：淡灰色
+    ('aspect_title', {'font': (None, 14, 'bold'), 'foreground': 'primary_color'}),  # 方面标题：加粗变色
+    ('conclusion_title', {'font': (None, 14, 'bold'), 'foreground': 'danger_color'}),  # 结论标题：加粗变色
+    ('question', {'font': (None, 14, 'bold'), 'foreground': 'text_color'}),
+    ('hexagram', {'font': ("Consolas", 13), 'foreground': 'text_color'}),
+    ('separator', {'foreground': 'separator'}),
+    ('error', {'foreground': 'danger_color', 'font': (None, 12, 'bold')}),  # 错误信息样式
+    ('welcome', {'font': (None, 14), 'foreground': 'secondary_text', 'justify': 'center'}),
+    ('reference_title', {'font': (None, 14, 'bold'), 'foreground': 'primary_color'}),  # 参考文献标题样式
+    ('reference_text', {'foreground': 'gray_5', 'font': (None, 12)}),  # 参考文献内容样式
+)
+
+# 聊天气泡和历史记录分割线用到的主题颜色，只有这些颜色变化时才需要刷新气泡
+CHAT_THEME_COLOR_KEYS = (
+    'card_bg', 'text_color', 'primary_color', 'accent_color', 'danger_color',
+    'gray_2', 'secondary_color', 'separator', 'secondary_text'
+)
+
+# 流式插入解读结果时滚动到底部的最小间隔（毫秒，约30Hz）
+RESULT_SEE_INTERVAL = 33
+
+# 聊天消息达到此数量后，只为可见区域附近的消息保留组件
+CHAT_CLIP_THRESHOLD = 40
+# 可见区域上下额外保留显示的像素范围，滚动时不至于露出空白
+CHAT_CLIP_MARGIN = 600
+
+
+class ChatBubbleCanvas(ctk.CTkCanvas):
+    """在一个画布上绘制完整的聊天气泡（头像、标签、圆角气泡和消息文本）
+    
+    取代原先每条消息8个以上CTkFrame/CTkLabel组成的组件树。支持configure(text=...)，
+    因此可以直接用于typing_animation。
+    """
+    
+    AVATAR_SIZE = 24
+    HEADER_HEIGHT = 28  # 头像行高度（含与气泡之间的间距）
+    PAD_X = 12
+    PAD_Y = 8
+    RADIUS = 18
+    TAIL_SIZE = 8
+    
+    def __init__(self, master, message, is_user=True, is_error=False, **kwargs):
+        font_family = UI_SETTINGS['font_family']
+        super().__init__(master, height=1, highlightthickness=0, bg=UI_SETTINGS['colors']['card_bg'], **kwargs)
+        
+        self._text = message
+        self._is_user = is_user
+        self._is_error = is_error
+        self._load_colors()
+        if is_user:
+            self._label_text, self._avatar_text = "我", "👤"
+        else:
+            self._label_text, self._avatar_text = "AI", "🤖"
+        
+        # AI回复使用较大字体和较宽的气泡，用户消息和错误消息更紧凑
+        if is_user or is_error:
+            self._font = (font_family, 12)
+            self._wraplength = 300
+        else:
+            self._font = (font_family, 14)
+            self._wraplength = 450
+        self._label_font = (font_family, 10, "bold")
+        self._drawn_width = None  # 头像行按此宽度绘制，宽度不变时只重绘气泡
+        
+        self.bind("<Configure>", self._redraw)
+        self._redraw()
+    
+    def _load_colors(self):
+        """从当前主题读取气泡各部分的颜色"""
+        colors = UI_SETTINGS['colors']
+        self._text_color = colors['text_color']
+        if self._is_user:
+            self._bubble_color = colors['primary_color']
+            self._message_color = "white"
+            self._avatar_color = colors['accent_color']
+        else:
+            if self._is_error:
+                self._bubble_color = colors['danger_color']
+                self._message_color = "white"
+            else:
+                self._bubble_color = colors['gray_2']
+                self._message_color = colors['text_color']
+            self._avatar_color = colors['secondary_color']
+    
+    def update_theme(self):
+        """按当前主题重新着色，只修改已绘制图形的颜色，不重新排版文本"""
+        self._load_colors()
+        super().configure(bg=UI_SETTINGS['colors']['card_bg'])
+        self.itemconfigure("avatar", fill=self._avatar_color)
+        self.itemconfigure("label", fill=self._text_color)
+        self.itemconfigure("bubble_bg", fill=self._bubble_color)
+        self.itemconfigure("bubble_text", fill=self._message_color)
+    
+    def configure(self, cnf=None, **kwargs):
+        """支持text参数以更新消息文本，其余参数交给Canvas处理"""
+        if "text" in kwargs:
+            self._text = kwargs.pop("text")
+            self._redraw()
+        if cnf or kwargs:
+            super().configure(cnf, **kwargs)
+    
+    config = configure
+    
+    def _redraw(self, event=None):
+        """按当前宽度和文本重新绘制气泡"""
+        width = self.winfo_width()
+        if width <= 1:
+            width = self._wraplength + 2 * self.PAD_X
+        
+        if width != self._drawn_width:
+            self._drawn_width = width
+            self._draw_header(width)
+        elif event is not None:
+            return  # 宽度未变（仅自身高度调整触发），无需重绘
+        self.delete("bubble")
+        
+        # 先绘制文本以测量尺寸，再在其下方绘制气泡
+        # 空文本（打字机效果开始前）时bbox为None，用空格占一行高度
+        text_id = self.create_text(0, 0, text=self._text or " ", font=self._font, fill=self._message_color,
+                                   width=self._wraplength, anchor="nw", justify="left",
+                                   tags=("bubble", "bubble_text"))
+        x1, y1, x2, y2 = self.bbox(text_id)
+        bubble_width = (x2 - x1) + 2 * self.PAD_X
+        bubble_height = (y2 - y1) + 2 * self.PAD_Y
+        bubble_x = width - bubble_width if self._is_user else 0
+        bubble_y = self.HEADER_HEIGHT
+        
+        bubble_id = create_rounded_rectangle(
+            self, bubble_x, bubble_y, bubble_x + bubble_width, bubble_y + bubble_height,
+            radius=self.RADIUS, fill=self._bubble_color, outline="", tags=("bubble", "bubble_bg")
+        )
+        # 小尾巴：靠近头像一侧的直角
+        tail_x = bubble_x + bubble_width - self.TAIL_SIZE if self._is_user else bubble_x
+        tail_id = self.create_rectangle(tail_x, bubble_y, tail_x + self.TAIL_SIZE, bubble_y + self.TAIL_SIZE,
+                                        fill=self._bubble_color, outline="", tags=("bubble", "bubble_bg"))
+        self.tag_lower(tail_id)
+        self.tag_lower(bubble_id)
+        self.coords(text_id, bubble_x + self.PAD_X, bubble_y + self.PAD_Y)
+        
+        height = bubble_y + bubble_height + 5
+        if int(self.cget("height")) != height:
+            super().configure(height=height)
+    
+    def _draw_header(self, width):
+        """绘制头像行：用户在右侧（标签在头像左边），AI在左侧"""
+        self.delete("header")
+        size = self.AVATAR_SIZE
+        avatar_x = width - size if self._is_user else 0
+        self.create_oval(avatar_x, 0, avatar_x + size, size, fill=self._avatar_color, outline="",
+                         tags=("header", "avatar"))
+        self.create_text(avatar_x + size / 2, size / 2, text=self._avatar_text,
+                         font=(self._label_font[0], 12), fill="white", tags="header")
+        if self._is_user:
+            self.create_text(avatar_x - 5, size / 2, text=self._label_text, font=self._label_font,
+                             fill=self._text_color, anchor="e", tags=("header", "label"))
+        else:
+            self.create_text(size + 5, size / 2, text=self._label_text, font=self._label_font,
+                             fill=self._text_color, anchor="w", tags=("header", "label"))
+
+
+class HistoryDividerCanvas(ctk.CTkCanvas):
+    """在一个画布上绘制历史记录分割线（两侧横线和中间文字），取代原先5个嵌套的CTkFrame/CTkLabel"""
+    
+    HEIGHT = 30
+    TEXT_GAP = 10  # 文字与两侧横线的间距
+    
+    def __init__(self, master, text, **kwargs):
+        super().__init__(master, height=self.HEIGHT, highlightthickness=0,
+                         bg=UI_SETTINGS['colors']['card_bg'], **kwargs)
+        self._text = text
+        self._font = (UI_SETTINGS['font_family'], 12)
+        self.bind("<Configure>", self._redraw)
+        self._redraw()
+    
+    def update_theme(self):
+        """按当前主题重新着色"""
+        colors = UI_SETTINGS['colors']
+        super().configure(bg=colors['card_bg'])
+        self.itemconfigure("line", fill=colors['separator'])
+        self.itemconfigure("text", fill=colors['secondary_text'])
+    
+    def _redraw(self, event=None):
+        """按当前宽度重新绘制"""
+        colors = UI_SETTINGS['colors']
+        width = self.winfo_width()
+        self.delete("all")
+        center_x, center_y = width / 2, self.HEIGHT / 2
+        text_id = self.create_text(center_x, center_y, text=self._text, font=self._font,
+                                   fill=colors['secondary_text'], tags="text")
+        x1, _, x2, _ = self.bbox(text_id)
+        if width > 1:
+            self.create_line(0, center_y, x1 - self.TEXT_GAP, center_y,
+                             fill=colors['separator'], tags="line")
+            self.create_line(x2 + self.TEXT_GAP, center_y, width, center_y,
+                             fill=colors['separator'], tags="line")
+
+
 class NotebookFrame(ctk.CTkFrame):
     """应用程序选项卡区域，包含卦象信息、解读结果和对话选项卡"""
     
-    def __init__(self, master, on_tab_changed=None, **kwargs):
+    def __init__(self, master, on_tab_changed=None, on_chat_message=None, **kwargs):
         super().__init__(
             master, 
             corner_radius=UI_SETTINGS['component']['card_corner_radius'],
@@ -27,6 +246,19 @@ class NotebookFrame(ctk.CTkFrame):
         
         # 保存回调函数
         self.on_tab_changed_callback = on_tab_changed
+        self.on_chat_message_callback = on_chat_message
+        
+        # 批量插入嵌套深度（>0 时insert_result不再逐次切换状态和滚动）
+        self._batch_depth = 0
+        
+        # 是否处于流式插入中（期间结果文本框保持可编辑，insert_result不再逐次切换状态）
+        self._streaming = False
+        
+        # 解读结果纯文本缓存（内容变化时失效），避免每次读取都经Tcl复制全文
+        self._result_cache = None
+        
+        # 是否已安排滚动解读结果到底部
+        self._pending_see = False
         
         # 配置网格布局
         self.grid_columnconfigure(0, weight=1)
@@ -34,35 +266,54 @@ class NotebookFrame(ctk.CTkFrame):
         
         # 创建选项卡区域组件
         self.create_widgets()
+        
+        # 组件按当前主题创建；主题未变化时update_theme直接返回
+        self._theme_snapshot = self._get_theme_snapshot()
+        self._chat_theme_state = self._get_chat_theme_state()
+    
+    @staticmethod
+    def _get_theme_snapshot():
+        """当前主题的快照（字体和全部颜色），用于判断主题是否变化"""
+        return UI_SETTINGS['font_family'], tuple(sorted(UI_SETTINGS['colors'].items()))
+    
+    @staticmethod
+    def _get_chat_theme_state():
+        """聊天气泡用到的字体和颜色"""
+        colors = UI_SETTINGS['colors']
+        return (UI_SETTINGS['font_family'],) + tuple(colors[key] for key in CHAT_THEME_COLOR_KEYS)
     
     def create_widgets(self):
         """创建选项卡区域的组件"""
+        colors = UI_SETTINGS['colors']
+        
         # 创建选项卡控件
         self.tabview = ctk.CTkTabview(
             self,
             corner_radius=UI_SETTINGS['component']['card_corner_radius'],
-            fg_color=UI_SETTINGS['colors']['card_bg'],
-            segmented_button_fg_color=UI_SETTINGS['colors']['gray_2'],
-            segmented_button_selected_color=UI_SETTINGS['colors']['primary_color'],
-            segmented_button_selected_hover_color=UI_SETTINGS['colors']['primary_alpha_20'],
-            segmented_button_unselected_color=UI_SETTINGS['colors']['gray_2'],
-            segmented_button_unselected_hover_color=UI_SETTINGS['colors']['gray_3'],
-            text_color=UI_SETTINGS['colors']['text_color'],
-            text_color_disabled=UI_SETTINGS['colors']['secondary_text']
+            fg_color=colors['card_bg'],
+            segmented_button_fg_color=colors['gray_2'],
+            segmented_button_selected_color=colors['primary_color'],
+            segmented_button_selected_hover_color=colors['primary_alpha_20'],
+            segmented_button_unselected_color=colors['gray_2'],
+            segmented_button_unselected_hover_color=colors['gray_3'],
+            text_color=colors['text_color'],
+            text_color_disabled=colors['secondary_text']
         )
         self.tabview.grid(row=0, column=0, sticky="nsew", padx=2, pady=2)
         
-        # 创建选项卡
-        self.hexagram_tab = self.tabview.add(t("tab_hexagram"))
-        self.result_tab = self.tabview.add(t("tab_result"))
-        self.chat_tab = self.tabview.add(t("tab_chat"))
-        self.history_tab = self.tabview.add(t("tab_history"))
-        self.settings_tab = self.tabview.add(t("tab_settings"))
+        # 创建选项卡（标题只翻译一次，select_tab等直接复用）
+        self._tab_labels = (
+            t("tab_hexagram"), t("tab_result"), t("tab_chat"), t("tab_history"), t("tab_settings")
+        )
+        (self.hexagram_tab, self.result_tab, self.chat_tab,
+         self.history_tab, self.settings_tab) = [self.tabview.add(label) for label in self._tab_labels]
         
-        # 配置选项卡的网格布局
-        for tab in [self.hexagram_tab, self.result_tab, self.chat_tab, self.history_tab, self.settings_tab]:
-            tab.grid_columnconfigure(0, weight=1)
-            tab.grid_rowconfigure(0, weight=1)  # 让文本区域可以扩展
+        # 配置选项卡的网格布局（让文本区域可以扩展），合并为一次Tcl调用
+        tabs = (self.hexagram_tab, self.result_tab, self.chat_tab, self.history_tab, self.settings_tab)
+        self.tk.eval('; '.join(
+            f'grid columnconfigure {tab._w} 0 -weight 1; grid rowconfigure {tab._w} 0 -weight 1'
+            for tab in tabs
+        ))
         
         # 1. 卦象信息选项卡
         # 卦象输入说明
@@ -70,75 +321,73 @@ class NotebookFrame(ctk.CTkFrame):
         self.hexagram_instruction = ctk.CTkLabel(
             self.hexagram_tab,
             textvariable=self.hexagram_instruction_var,
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=14  # 调整字体大小为14
-            ),
+            font=_font(UI_SETTINGS['font_family'], 14),
             anchor="w",
             wraplength=0  # 自适应宽度
         )
         self.hexagram_instruction.grid(row=0, column=0, sticky="ew", padx=0, pady=0)  # 完全去除上下间距
         
-        # 卦象文本框
-        self.hexagram_text = scrolledtext.ScrolledText(
+        # 卦象文本框（tk.Text加单独的滚动条，不再使用ScrolledText额外包裹的Frame）
+        self.hexagram_text = tk.Text(
             self.hexagram_tab,
             wrap=tk.WORD,
             font=("Consolas", 12),
-            bg=UI_SETTINGS['colors']['card_bg'],
-            fg=UI_SETTINGS['colors']['text_color'],
-            insertbackground=UI_SETTINGS['colors']['text_color'],  # 光标颜色
-            selectbackground=UI_SETTINGS['colors']['primary_color'],
-            selectforeground=UI_SETTINGS['colors']['text_color'],
+            bg=colors['card_bg'],
+            fg=colors['text_color'],
+            insertbackground=colors['text_color'],  # 光标颜色
+            selectbackground=colors['primary_color'],
+            selectforeground=colors['text_color'],
             relief="solid",
             bd=1,
-            highlightbackground=UI_SETTINGS['colors']['gray_3'],
-            highlightcolor=UI_SETTINGS['colors']['primary_color'],
+            highlightbackground=colors['gray_3'],
+            highlightcolor=colors['primary_color'],
             highlightthickness=1,
             padx=10,
             pady=10,
             height=20
         )
         self.hexagram_text.grid(row=1, column=0, sticky="nsew", padx=0, pady=0)
+        self.hexagram_scrollbar = ttk.Scrollbar(self.hexagram_tab, command=self.hexagram_text.yview)
+        self.hexagram_text.configure(yscrollcommand=self.hexagram_scrollbar.set)
+        self.hexagram_scrollbar.grid(row=1, column=1, sticky="ns")
         
         # 2. 解读结果选项卡
-        self.result_text = scrolledtext.ScrolledText(
+        self.result_text = tk.Text(
             self.result_tab,
             wrap=tk.WORD,
             font=(UI_SETTINGS['font_family'], 12),
-            bg=UI_SETTINGS['colors']['card_bg'],
-            fg=UI_SETTINGS['colors']['text_color'],
-            insertbackground=UI_SETTINGS['colors']['text_color'],
-            selectbackground=UI_SETTINGS['colors']['primary_color'],
-            selectforeground=UI_SETTINGS['colors']['text_color'],
+            bg=colors['card_bg'],
+            fg=colors['text_color'],
+            insertbackground=colors['text_color'],
+            selectbackground=colors['primary_color'],
+            selectforeground=colors['text_color'],
             relief="solid",
             bd=1,
-            highlightbackground=UI_SETTINGS['colors']['gray_3'],
-            highlightcolor=UI_SETTINGS['colors']['primary_color'],
+            highlightbackground=colors['gray_3'],
+            highlightcolor=colors['primary_color'],
             highlightthickness=1,
             padx=10,
             pady=10,
-            height=15
+            height=15,
+            undo=False  # 只读的结果区域不需要撤销栈，插入时不记录撤销信息
         )
-        self.result_text.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        self.result_text.grid(row=0, column=0, sticky="nsew", padx=(10, 0), pady=10)
+        self.result_scrollbar = ttk.Scrollbar(self.result_tab, command=self.result_text.yview)
+        self.result_text.configure(yscrollcommand=self.result_scrollbar.set)
+        self.result_scrollbar.grid(row=0, column=1, sticky="ns", padx=(0, 10), pady=10)
+        self.result_text.bind('<<Modified>>', self._on_result_modified)
         
         # 配置解读结果文本框的标签样式
-        self.result_text.tag_configure('main_text', foreground=UI_SETTINGS['colors']['text_color'])
-        self.result_text.tag_configure('explanation', foreground=UI_SETTINGS['colors']['gray_5'])  # 括号内容：淡灰色
-        self.result_text.tag_configure('aspect_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=UI_SETTINGS['colors']['primary_color'])  # 方面标题：加粗变色
-        self.result_text.tag_configure('conclusion_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=UI_SETTINGS['colors']['danger_color'])  # 结论标题：加粗变色
-        self.result_text.tag_configure('question', font=(UI_SETTINGS['font_family'], 14, 'bold'))
-        self.result_text.tag_configure('hexagram', font=("Consolas", 13))
-        self.result_text.tag_configure('separator', foreground=UI_SETTINGS['colors']['separator'])
-        self.result_text.tag_configure('error', foreground=UI_SETTINGS['colors']['danger_color'], font=(UI_SETTINGS['font_family'], 12, 'bold'))  # 错误信息样式
-        self.result_text.tag_configure('welcome', font=(UI_SETTINGS['font_family'], 14), foreground=UI_SETTINGS['colors']['secondary_text'], justify='center')
-        self.result_text.tag_configure('reference_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=UI_SETTINGS['colors']['primary_color'])  # 参考文献标题样式
-        self.result_text.tag_configure('reference_text', foreground=UI_SETTINGS['colors']['gray_5'], font=(UI_SETTINGS['font_family'], 12))  # 参考文献内容样式
+        self._result_tag_options = {}  # 各标签上次应用的参数，主题更新时只重新配置有变化的标签
+        self._configure_result_tags(colors)
         
         # 添加初始欢迎信息
         welcome_text = t("result_welcome_text")
         
         self.result_text.insert(tk.END, welcome_text, 'welcome')
         self.result_text.config(state=tk.DISABLED)  # 设置为只读
+        # 结果区域当前是否显示欢迎信息（首次插入结果时清除）
+        self._welcome_shown = True
         
         # 3. 对话选项卡
         # 创建聊天容器框架
@@ -151,13 +400,21 @@ class NotebookFrame(ctk.CTkFrame):
         self.chat_scrollable_frame = ctk.CTkScrollableFrame(
             chat_container,
             corner_radius=UI_SETTINGS['component']['card_corner_radius'],
-            fg_color=UI_SETTINGS['colors']['card_bg'],
-            scrollbar_button_color=UI_SETTINGS['colors']['gray_4'],
-            scrollbar_button_hover_color=UI_SETTINGS['colors']['gray_5']
+            fg_color=colors['card_bg'],
+            scrollbar_button_color=colors['gray_4'],
+            scrollbar_button_hover_color=colors['gray_5']
         )
         self.chat_scrollable_frame.grid(row=0, column=0, sticky="nsew")
         self.chat_scrollable_frame.grid_columnconfigure(0, weight=1)
         
+        # 待执行的滚动到底部任务（连续添加消息时合并）
+        self._chat_scroll_job = None
+        
+        # 滚动或尺寸变化时重新计算需要显示的气泡
+        self._chat_clip_job = None
+        self.chat_scrollable_frame._parent_canvas.configure(yscrollcommand=self._on_chat_yscroll)
+        self.chat_scrollable_frame._parent_canvas.bind("<Configure>", self._schedule_chat_clip, add="+")
+        
         # 聊天消息列表
         self.chat_messages = []
         
@@ -180,10 +437,7 @@ class NotebookFrame(ctk.CTkFrame):
         self.chat_model_label = ctk.CTkLabel(
             chat_model_frame,
             text=t("chat_model_label"),
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=12
-            )
+            font=_font(UI_SETTINGS['font_family'], 12)
         )
         self.chat_model_label.pack(side="left", padx=(0, 5))
         
@@ -193,18 +447,12 @@ class NotebookFrame(ctk.CTkFrame):
             chat_model_frame,
             values=SUPPORTED_MODELS,
             variable=self.chat_model_var,
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=12
-            ),
-            dropdown_font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=12
-            ),
+            font=_font(UI_SETTINGS['font_family'], 12),
+            dropdown_font=_font(UI_SETTINGS['font_family'], 12),
             width=150,
-            fg_color=UI_SETTINGS['colors']['primary_color'],
-            button_color=UI_SETTINGS['colors']['primary_color'],
-            button_hover_color=UI_SETTINGS['colors']['primary_alpha_20']
+            fg_color=colors['primary_color'],
+            button_color=colors['primary_color'],
+            button_hover_color=colors['primary_alpha_20']
         )
         self.chat_model_menu.pack(side="left")
         
@@ -217,10 +465,7 @@ class NotebookFrame(ctk.CTkFrame):
         self.chat_entry = ctk.CTkEntry(
             input_container,
             placeholder_text=t("chat_input_placeholder"),
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=14
-            ),
+            font=_font(UI_SETTINGS['font_family'], 14),
             height=35
         )
         self.chat_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5))
@@ -230,15 +475,12 @@ class NotebookFrame(ctk.CTkFrame):
         self.send_button = ctk.CTkButton(
             input_container,
             text="发送",
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=12
-            ),
+            font=_font(UI_SETTINGS['font_family'], 12),
             width=80,
             height=35,
             command=self.send_chat_message,
-            fg_color=UI_SETTINGS['colors']['primary_color'],
-            hover_color=UI_SETTINGS['colors']['primary_alpha_20']
+            fg_color=colors['primary_color'],
+            hover_color=colors['primary_alpha_20']
         )
         self.send_button.grid(row=0, column=1)
         
@@ -246,21 +488,35 @@ class NotebookFrame(ctk.CTkFrame):
         self.chat_entry.configure(state="disabled")
         self.send_button.configure(state="disabled")
         
-        # 4. 历史记录选项卡
-        self.history_frame = HistoryFrame(self.history_tab)
-        self.history_frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
-        
-        # 5. 设置选项卡
+        # 4. 历史记录选项卡、5. 设置选项卡：首次切换到该选项卡（或首次需要时）才创建
         from .settings_frame import SettingsFrame
-        self.settings_frame = SettingsFrame(self.settings_tab)
-        self.settings_frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
+        self._lazy_tabs = {
+            self._tab_labels[3]: ('history_frame', HistoryFrame, self.history_tab),
+            self._tab_labels[4]: ('settings_frame', SettingsFrame, self.settings_tab),
+        }
         
         # 绑定选项卡切换事件
         # 使用正确的方法绑定标签页切换事件
         self.tabview.configure(command=self._on_tab_changed)
     
+    def _build_lazy_tab(self, tab_name):
+        """创建延迟构建的选项卡内容（已创建或不是延迟选项卡时不做任何事）"""
+        spec = self._lazy_tabs.pop(tab_name, None)
+        if spec is None:
+            return
+        attr_name, frame_class, tab = spec
+        frame = frame_class(tab)
+        frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
+        setattr(self, attr_name, frame)
+        logger.debug(f"选项卡内容已创建: {tab_name}")
+    
+    def get_settings_frame(self):
+        """获取设置页面，尚未创建（用户还未打开设置选项卡）时返回None，不在此处创建组件"""
+        return getattr(self, 'settings_frame', None)
+    
     def _on_tab_changed(self):
         """选项卡切换事件内部处理"""
+        self._build_lazy_tab(self.tabview.get())
         if self.on_tab_changed_callback:
             current_tab = self.tabview.get()
             self.on_tab_changed_callback(current_tab)
@@ -270,10 +526,9 @@ class NotebookFrame(ctk.CTkFrame):
         return self.tabview.get()
     
     def select_tab(self, index):
-        """选择指定的选项卡"""
-        tabs = [t("tab_hexagram"), t("tab_result"), t("tab_chat")]
-        if 0 <= index < len(tabs):
-            self.tabview.set(tabs[index])
+        """选择指定的选项卡（0卦象、1解读结果、2对话）"""
+        if 0 <= index < 3:
+            self.tabview.set(self._tab_labels[index])
     
     def update_hexagram_instruction(self, divination_method):
         """更新卦象输入说明"""
@@ -292,11 +547,40 @@ class NotebookFrame(ctk.CTkFrame):
         except Exception as e:
             logger.error(f"设置卦象内容时出错: {e}")
     
+    def _configure_result_tags(self, colors):
+        """按RESULT_TAG_STYLES配置解读结果的文本标签，参数与上次相同的标签跳过"""
+        font_family = UI_SETTINGS['font_family']
+        for tag, style in RESULT_TAG_STYLES:
+            options = {}
+            for option, value in style.items():
+                if option == 'foreground':
+                    value = colors[value]
+                elif option == 'font' and value[0] is None:
+                    value = (font_family,) + value[1:]
+                options[option] = value
+            if self._result_tag_options.get(tag) != options:
+                self.result_text.tag_configure(tag, **options)
+                self._result_tag_options[tag] = options
+    
+    def _on_result_modified(self, event=None):
+        """解读结果被修改（包括打字机动画等外部修改）时使缓存失效"""
+        self._result_cache = None
+        self.result_text.edit_modified(False)
+    
+    def get_result_text(self):
+        """获取解读结果纯文本（不含末尾换行），内容未变化时直接返回缓存"""
+        if self._result_cache is None:
+            self._result_cache = self.result_text.get(1.0, "end-1c")
+        return self._result_cache
+    
     def set_result_content(self, content):
         """设置解读结果内容"""
         try:
+            self._result_cache = None
+            self._streaming = False  # 整体替换内容后不再处于流式插入状态
             self.result_text.config(state=tk.NORMAL)
             self.result_text.delete(1.0, tk.END)
+            self._welcome_shown = False
             
             # 解析并应用格式化
             self._parse_and_format_content(content)
@@ -306,94 +590,90 @@ class NotebookFrame(ctk.CTkFrame):
             logger.error(f"设置解读结果时出错: {e}")
     
     def _parse_and_format_content(self, content):
-        """解析内容并应用格式化标签"""
-        import re
+        """解析内容并应用格式化标签
         
-        def insert_text_with_brackets(text, default_tag='main_text'):
-            """处理包含括号的文本，为括号内容应用特殊格式"""
-            # 处理圆括号
-            if '（' in text and '）' in text:
-                parts = re.split(r'(（[^）]*）)', text)
-                for part in parts:
-                    if part.startswith('（') and part.endswith('）'):
-                        self.result_text.insert(tk.END, part, 'explanation')
-                    elif part.strip():
-                        self.result_text.insert(tk.END, part, default_tag)
-            # 处理方括号
-            elif '[' in text and ']' in text:
-                parts = re.split(r'(\[[^\]]*\])', text)
-                for part in parts:
-                    if part.startswith('[') and part.endswith(']'):
-                        self.result_text.insert(tk.END, part, 'explanation')
-                    elif part.strip():
-                        self.result_text.insert(tk.END, part, default_tag)
-            else:
-                # 没有括号，直接插入
-                if text.strip():
-                    self.result_text.insert(tk.END, text, default_tag)
+        先生成(文本, 标签)片段列表，最后通过一次insert调用全部插入，避免每个片段都往返一次Tcl。
+        """
+        segments = []
+        append = segments.append
         
-        lines = content.split('\n')
-        for line in lines:
+        def append_text_with_brackets(text, default_tag='main_text'):
+            """处理包含括号的文本，为括号内容应用特殊格式"""
+            # 一次切分同时处理圆括号和方括号：奇数下标是括号内容，偶数下标是普通文本
+            for i, part in enumerate(_SPLIT_BRACKETS.split(text)):
+                if i % 2:
+                    append((part, 'explanation'))
+                elif part.strip():
+                    append((part, default_tag))
+        
+        newline = ('\n', ())
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
-                self.result_text.insert(tk.END, '\n')
+                append(newline)
                 continue
 
             # 检查是否是【】格式的标题（如：【用神判断】、【用神卦理分析】等）
-            if re.match(r'^【[^】]*】$', line):
+            if _TITLE_BRACKET.match(line):
                 title = line.replace('【', '').replace('】', '')
-                self.result_text.insert(tk.END, title + '\n', 'aspect_title')
+                append((title + '\n', 'aspect_title'))
             # 检查是否是数字编号标题（如：1、当前财务状况：、2、财运的变化趋势：等）
-            title_match = re.match(r'^(\d+、[^：:]*[：:])(.*)$', line)
+            title_match = _TITLE_NUM.match(line)
             if title_match:
                 title_part = title_match.group(1)  # 标题部分
                 content_part = title_match.group(2)  # 内容部分
-                self.result_text.insert(tk.END, title_part, 'aspect_title')
+                append((title_part, 'aspect_title'))
                 if content_part.strip():
-                    insert_text_with_brackets(content_part, 'main_text')
-                self.result_text.insert(tk.END, '\n')
+                    append_text_with_brackets(content_part, 'main_text')
+                append(newline)
             # 检查是否是方面标题（如：**事业运势**、**感情运势**等）
-            elif re.match(r'^\*\*.*\*\*$', line):
+            elif _TITLE_BOLD.match(line):
                 title = line.replace('**', '')
-                self.result_text.insert(tk.END, title + '\n', 'aspect_title')
+                append((title + '\n', 'aspect_title'))
             # 检查是否是结论标题（只匹配以"结论"开头且包含冒号的行）
-            elif re.match(r'^结论[：:]', line):
-                conclusion_match = re.match(r'^(结论[：:])(.*)$', line)
-                if conclusion_match:
-                    title_part = conclusion_match.group(1)  # "结论："部分
-                    content_part = conclusion_match.group(2)  # 内容部分
-                    self.result_text.insert(tk.END, title_part, 'conclusion_title')
-                    if content_part.strip():
-                        insert_text_with_brackets(content_part, 'main_text')
-                    self.result_text.insert(tk.END, '\n')
-                else:
-                    self.result_text.insert(tk.END, line + '\n', 'conclusion_title')
+            elif _TITLE_CONCLUSION.match(line):
+                # "结论："固定为3个字符
+                title_part = line[:3]  # "结论："部分
+                content_part = line[3:]  # 内容部分
+                append((title_part, 'conclusion_title'))
+                if content_part.strip():
+                    append_text_with_brackets(content_part, 'main_text')
+                append(newline)
             # 检查是否是参考文件标题
-            elif re.match(r'^参考文件[：:]', line):
-                self.result_text.insert(tk.END, line, 'reference_title')
-                self.result_text.insert(tk.END, '\n')
+            elif _TITLE_REFERENCE.match(line):
+                append((line, 'reference_title'))
+                append(newline)
             # 检查是否是参考文件列表项（以•开头）
             elif line.startswith('•'):
-                self.result_text.insert(tk.END, line, 'reference_text')
-                self.result_text.insert(tk.END, '\n')
+                append((line, 'reference_text'))
+                append(newline)
             # 普通文本（包含括号内容的处理）
             else:
-                insert_text_with_brackets(line, 'main_text')
-                self.result_text.insert(tk.END, '\n')
+                append_text_with_brackets(line, 'main_text')
+                append(newline)
+        
+        if segments:
+            # Text.insert支持 文本, 标签, 文本, 标签... 的参数序列，一次调用插入全部片段
+            self.result_text.insert(tk.END, *(item for segment in segments for item in segment))
     
     def clear_result(self):
         """清空解读结果"""
+        self._result_cache = None
+        self._streaming = False  # 清空后恢复只读，避免遗留的流式状态让文本框保持可编辑
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
         # 重新添加欢迎信息
         welcome_text = t("result_welcome_text")
         self.result_text.insert(tk.END, welcome_text, 'welcome')
         self.result_text.config(state=tk.DISABLED)
+        self._welcome_shown = True
     
     def clear_all(self):
         """清空所有内容"""
         self.hexagram_text.delete(1.0, tk.END)
+        self._result_cache = None
         self.result_text.delete(1.0, tk.END)
+        self._welcome_shown = False
         self.chat_display.config(state=tk.NORMAL)
         self.chat_display.delete(1.0, tk.END)
         self.chat_display.config(state=tk.DISABLED)
@@ -402,24 +682,95 @@ class NotebookFrame(ctk.CTkFrame):
         self.chat_entry.configure(state="disabled")
         self.send_button.configure(state="disabled")
     
+    @contextmanager
+    def batched_inserts(self):
+        """批量插入解读结果，整个块只解锁/加锁和滚动一次
+        
+        用法::
+        
+            with notebook_frame.batched_inserts():
+                notebook_frame.insert_result(...)
+                notebook_frame.insert_result(...)
+        """
+        if self._batch_depth:
+            # 嵌套调用时由最外层统一处理
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+            return
+        
+        if not self._streaming:
+            self.result_text.configure(state=tk.NORMAL)
+        self._batch_depth = 1
+        try:
+            yield
+        finally:
+            self._batch_depth = 0
+            if not self._streaming:
+                self.result_text.configure(state=tk.DISABLED)
+            self.result_text.see(tk.END)  # 整块插入完成后只滚动一次
+    
+    def begin_streaming(self):
+        """开始流式插入：结果文本框保持可编辑，直到end_streaming才恢复只读"""
+        if not self._streaming:
+            self._streaming = True
+            self.result_text.configure(state=tk.NORMAL)
+    
+    def end_streaming(self):
+        """结束流式插入，恢复结果文本框的只读状态"""
+        if self._streaming:
+            self._streaming = False
+            if not self._batch_depth:
+                self.result_text.configure(state=tk.DISABLED)
+    
     def insert_result(self, text, tag=None):
         """插入解读结果文本"""
-        self.result_text.config(state=tk.NORMAL)
-        # 如果是第一次插入结果，先清空欢迎信息
-        current_content = self.result_text.get(1.0, tk.END).strip()
-        if "欢迎使用AI易学解读功能" in current_content:
+        self._result_cache = None
+        batching = self._batch_depth > 0
+        toggle_state = not (batching or self._streaming)
+        if toggle_state:
+            self.result_text.config(state=tk.NORMAL)
+        # 如果是第一次插入结果，先清空欢迎信息（用标志判断，不必每次读取全文）
+        if self._welcome_shown:
             self.result_text.delete(1.0, tk.END)
+            self._welcome_shown = False
         
         if tag:
             self.result_text.insert(tk.END, text, tag)
         else:
             self.result_text.insert(tk.END, text)
-        self.result_text.see(tk.END)  # 滚动到底部
-        self.result_text.config(state=tk.DISABLED)
+        if not batching:
+            self._schedule_result_see()  # 滚动到底部
+        if toggle_state:
+            self.result_text.config(state=tk.DISABLED)
+    
+    def _schedule_result_see(self):
+        """限制滚动到底部的频率：流式输出时多次插入合并为一次滚动"""
+        if not self._pending_see:
+            self._pending_see = True
+            self.result_text.after(RESULT_SEE_INTERVAL, self._flush_result_see)
+    
+    def _flush_result_see(self):
+        """执行待处理的滚动到底部"""
+        self._pending_see = False
+        self.result_text.see(tk.END)
     
-    def insert_result_with_animation(self, text, tag=None, speed=30):
-        """使用打字机效果插入解读结果文本"""
-        typing_animation(self.result_text, text, tag, speed)
+    def insert_result_with_animation(self, text, tag=None, speed=30, chunk=8):
+        """使用打字机效果插入解读结果文本，每speed毫秒插入chunk个字符"""
+        def insert_chunk(index=0):
+            if not self.result_text.winfo_exists():
+                return
+            self.insert_result(text[index:index + chunk], tag)
+            if index + chunk < len(text):
+                self.result_text.after(speed, insert_chunk, index + chunk)
+            else:
+                self.end_streaming()
+        
+        if text:
+            self.begin_streaming()
+            insert_chunk()
     
     def enable_chat(self):
         """启用聊天功能"""
@@ -441,6 +792,8 @@ class NotebookFrame(ctk.CTkFrame):
         self.send_button.configure(state="disabled")
         
         # 添加加载动画指示器
+        active_color = UI_SETTINGS['colors']['primary_color']
+        idle_color = UI_SETTINGS['colors']['secondary_color']
         loading_frame = ctk.CTkFrame(
             self.chat_scrollable_frame,
             fg_color="transparent"
@@ -451,8 +804,8 @@ class NotebookFrame(ctk.CTkFrame):
         loading_label = ctk.CTkLabel(
             loading_frame,
             text="",  # 初始为空，将通过打字机效果填充
-            font=ctk.CTkFont(family=UI_SETTINGS['font_family'], size=12),
-            text_color=UI_SETTINGS['colors']['primary_color']
+            font=_font(UI_SETTINGS['font_family'], 12),
+            text_color=active_color
         )
         loading_label.grid(row=0, column=0, sticky="w", padx=5)
         
@@ -468,8 +821,8 @@ class NotebookFrame(ctk.CTkFrame):
         dot1 = ctk.CTkLabel(
             dots_frame,
             text="•",
-            font=ctk.CTkFont(size=16, weight="bold"),
-            text_color=UI_SETTINGS['colors']['primary_color'],
+            font=_font(None, 16, "bold"),
+            text_color=active_color,
             width=dot_size
         )
         dot1.grid(row=0, column=0, padx=2)
@@ -477,8 +830,8 @@ class NotebookFrame(ctk.CTkFrame):
         dot2 = ctk.CTkLabel(
             dots_frame,
             text="•",
-            font=ctk.CTkFont(size=16, weight="bold"),
-            text_color=UI_SETTINGS['colors']['primary_color'],
+            font=_font(None, 16, "bold"),
+            text_color=active_color,
             width=dot_size
         )
         dot2.grid(row=0, column=1, padx=2)
@@ -486,8 +839,8 @@ class NotebookFrame(ctk.CTkFrame):
         dot3 = ctk.CTkLabel(
             dots_frame,
             text="•",
-            font=ctk.CTkFont(size=16, weight="bold"),
-            text_color=UI_SETTINGS['colors']['primary_color'],
+            font=_font(None, 16, "bold"),
+            text_color=active_color,
             width=dot_size
         )
         dot3.grid(row=0, column=2, padx=2)
@@ -495,33 +848,27 @@ class NotebookFrame(ctk.CTkFrame):
         # 保存加载动画引用以便后续移除
         self.loading_frame = loading_frame
         
-        # 使用打字机效果显示文本
-        from utils.animation import typing_animation, pulse_animation
-        
         # 打字机效果显示"AI正在思考中"
-        typing_animation(loading_label, "AI正在思考中", delay=80)
+        typing_animation(loading_label, "AI正在思考中", delay=160, chunk=2)
+        
+        # 三个点依次高亮，由一个周期性定时器驱动
+        dots = (dot1, dot2, dot3)
+        dot_index = [0]  # 使用列表以便在闭包中修改
         
-        # 为三个点添加脉冲动画
-        def animate_dots():
-            if not hasattr(self, 'loading_frame') or not self.loading_frame.winfo_exists():
+        def tick_dots():
+            if not loading_frame.winfo_exists():
                 return
-                
-            pulse_animation(dot1, "text_color", 
-                          UI_SETTINGS['colors']['primary_color'], 
-                          UI_SETTINGS['colors']['secondary_color'], 
-                          duration=600, repeat=1,
-                          callback=lambda: pulse_animation(dot2, "text_color", 
-                                                        UI_SETTINGS['colors']['primary_color'], 
-                                                        UI_SETTINGS['colors']['secondary_color'], 
-                                                        duration=600, repeat=1,
-                                                        callback=lambda: pulse_animation(dot3, "text_color", 
-                                                                                      UI_SETTINGS['colors']['primary_color'], 
-                                                                                      UI_SETTINGS['colors']['secondary_color'], 
-                                                                                      duration=600, repeat=1,
-                                                                                      callback=lambda: self.loading_frame.after(300, animate_dots) if hasattr(self, 'loading_frame') and self.loading_frame.winfo_exists() else None)))
+            current = dot_index[0]
+            previous = (current - 1) % len(dots)
+            dots[previous].configure(text_color=idle_color)
+            dots[current].configure(text_color=active_color)
+            dot_index[0] = (current + 1) % len(dots)
+            loading_frame.after(400, tick_dots)
         
         # 开始动画
-        animate_dots()
+        for dot in dots[1:]:
+            dot.configure(text_color=idle_color)
+        tick_dots()
         
         # 如果是第一次发送消息，清除欢迎消息
         if self.is_first_chat_message:
@@ -532,8 +879,8 @@ class NotebookFrame(ctk.CTkFrame):
         self.add_chat_bubble(user_message, is_user=True)
         
         # 通知主应用程序处理聊天消息
-        if hasattr(self.master, "handle_chat_message"):
-            self.master.handle_chat_message(user_message, self.chat_model_var.get())
+        if self.on_chat_message_callback:
+            self.on_chat_message_callback(user_message, self.chat_model_var.get())
     
     def add_ai_response(self, message, is_error=False):
         """添加AI回复到聊天区域"""
@@ -569,10 +916,7 @@ class NotebookFrame(ctk.CTkFrame):
         welcome_label = ctk.CTkLabel(
             welcome_frame,
             text=welcome_text,
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=14
-            ),
+            font=_font(UI_SETTINGS['font_family'], 14),
             text_color=UI_SETTINGS['colors']['secondary_text'],
             justify="center"
         )
@@ -593,8 +937,9 @@ class NotebookFrame(ctk.CTkFrame):
             add_welcome: 是否添加欢迎消息，默认为True
         """
         # 删除所有聊天气泡
+        self._release_clipped_rows()
         for msg in self.chat_messages:
-            if 'frame' in msg and msg['frame'].winfo_exists():
+            if msg.get('frame') is not None and msg['frame'].winfo_exists():
                 msg['frame'].destroy()
         
         # 清空消息列表
@@ -615,392 +960,203 @@ class NotebookFrame(ctk.CTkFrame):
             use_typing_effect: 是否使用打字机效果（仅对AI消息有效）
         """
 
-        # 创建消息容器
-        message_frame = ctk.CTkFrame(
-            self.chat_scrollable_frame,
-            fg_color="transparent"
-        )
-        message_frame.grid(row=len(self.chat_messages), column=0, sticky="ew", pady=(10, 5), padx=10)
-        message_frame.grid_columnconfigure(0, weight=1)
-        
-        # 创建主容器（包含头像、标签和气泡）
-        main_container = ctk.CTkFrame(
-            message_frame,
-            fg_color="transparent"
-        )
-        
-        if is_user:
-            # 用户消息居右
-            main_container.grid(row=0, column=0, sticky="e", padx=(50, 0))
-            bubble_bg_color = UI_SETTINGS['colors']['primary_color']
-            text_color = "white"
-            corner_radius = 18
-            label_text = "我"
-            avatar_color = UI_SETTINGS['colors']['accent_color']
-        else:
-            # AI消息居左
-            main_container.grid(row=0, column=0, sticky="w", padx=(0, 50))
-            if is_error:
-                bubble_bg_color = UI_SETTINGS['colors']['danger_color']
-                text_color = "white"
-            else:
-                bubble_bg_color = UI_SETTINGS['colors']['gray_2']
-                text_color = UI_SETTINGS['colors']['text_color']
-            corner_radius = 18
-            label_text = "AI"
-            avatar_color = UI_SETTINGS['colors']['secondary_color']
-        
-        # 创建头像和标签容器
-        header_frame = ctk.CTkFrame(
-            main_container,
-            fg_color="transparent"
-        )
-        header_frame.grid(row=0, column=0, sticky="ew", pady=(0, 2))
-        
-        if is_user:
-            # 用户：标签在左，头像在右
-            header_frame.grid_columnconfigure(0, weight=1)
-            
-            # 标签
-            label = ctk.CTkLabel(
-                header_frame,
-                text=label_text,
-                font=ctk.CTkFont(family=UI_SETTINGS['font_family'], size=10, weight="bold"),
-                text_color=UI_SETTINGS['colors']['text_color']
-            )
-            label.grid(row=0, column=0, sticky="e", padx=(0, 5))
-            
-            # 头像
-            avatar = ctk.CTkFrame(
-                header_frame,
-                width=24,
-                height=24,
-                fg_color=avatar_color,
-                corner_radius=12
-            )
-            avatar.grid(row=0, column=1, sticky="e")
-            avatar.grid_propagate(False)
-            
-            # 头像内的文字
-            avatar_label = ctk.CTkLabel(
-                avatar,
-                text="👤",
-                font=ctk.CTkFont(size=12),
-                text_color="white"
-            )
-            avatar_label.place(relx=0.5, rely=0.5, anchor="center")
-            
-        else:
-            # AI：头像在左，标签在右
-            header_frame.grid_columnconfigure(1, weight=1)
-            
-            # 头像
-            avatar = ctk.CTkFrame(
-                header_frame,
-                width=24,
-                height=24,
-                fg_color=avatar_color,
-                corner_radius=12
-            )
-            avatar.grid(row=0, column=0, sticky="w")
-            avatar.grid_propagate(False)
-            
-            # 头像内的文字
-            avatar_label = ctk.CTkLabel(
-                avatar,
-                text="🤖",
-                font=ctk.CTkFont(size=12),
-                text_color="white"
-            )
-            avatar_label.place(relx=0.5, rely=0.5, anchor="center")
-            
-            # 标签
-            label = ctk.CTkLabel(
-                header_frame,
-                text=label_text,
-                font=ctk.CTkFont(family=UI_SETTINGS['font_family'], size=10, weight="bold"),
-                text_color=UI_SETTINGS['colors']['text_color']
-            )
-            label.grid(row=0, column=1, sticky="w", padx=(5, 0))
-        
-        # 创建气泡容器（包含小尾巴）
-        bubble_container = ctk.CTkFrame(
-            main_container,
-            fg_color="transparent"
-        )
-        bubble_container.grid(row=1, column=0, sticky="ew")
-        
-        # 创建气泡
-        bubble = ctk.CTkFrame(
-            bubble_container,
-            fg_color=bubble_bg_color,
-            corner_radius=corner_radius
-        )
-        
-        if is_user:
-            # 用户气泡：小尾巴在右上角
-            bubble.grid(row=0, column=0, sticky="e", padx=(15, 0), pady=(0, 5))
-            # 创建小尾巴（右上角）
-            tail = ctk.CTkFrame(
-                bubble_container,
-                width=8,
-                height=8,
-                fg_color=bubble_bg_color,
-                corner_radius=0
-            )
-            tail.place(x=bubble.winfo_reqwidth()-4, y=2)
-        else:
-            # AI气泡：小尾巴在左上角
-            bubble.grid(row=0, column=0, sticky="w", padx=(0, 15), pady=(0, 5))
-            # 创建小尾巴（左上角）
-            tail = ctk.CTkFrame(
-                bubble_container,
-                width=8,
-                height=8,
-                fg_color=bubble_bg_color,
-                corner_radius=0
-            )
-            tail.place(x=4, y=2)
-        
-        # 为AI消息添加CTkLabel组件（不使用富文本）
-        if not is_user and not is_error:
-            # 直接使用普通文本显示消息
-            message_label = ctk.CTkLabel(
-                bubble,
-                text="",  # 初始为空，将通过打字机效果填充
-                font=ctk.CTkFont(
-                    family=UI_SETTINGS['font_family'],
-                    size=14  # 增大AI回复的字体大小
-                ),
-                text_color=text_color,
-                wraplength=450,  # 加宽AI回复气泡，减少换行
-                justify="left",
-                anchor="w"
-            )
-            message_label.grid(row=0, column=0, sticky="ew", padx=12, pady=8)
-            
-            # 使用打字机效果显示AI回复（仅当use_typing_effect为True时）
-            if use_typing_effect:
-                from utils.animation import typing_animation
-                typing_animation(message_label, message, delay=15, cursor="|", cursor_blink=True)
-            else:
-                # 直接显示完整消息，不使用打字机效果
-                message_label.configure(text=message)
-            
-        else:
-            # 用户消息或错误消息使用简单的Label
-            message_label = ctk.CTkLabel(
-                bubble,
-                text=message,
-                font=ctk.CTkFont(
-                    family=UI_SETTINGS['font_family'],
-                    size=12
-                ),
-                text_color=text_color,
-                wraplength=300,  # 限制气泡最大宽度
-                justify="left",
-                anchor="w"
-            )
-            message_label.grid(row=0, column=0, sticky="ew", padx=12, pady=8)
-        
-        # 保存消息记录
-        self.chat_messages.append({
-            'frame': message_frame,
+        # 每条消息只创建一个画布，头像、标签、气泡和文本都绘制在其中
+        typing = use_typing_effect and not is_user and not is_error
+        msg = {
             'message': message,
             'is_user': is_user,
             'is_error': is_error
-        })
+        }
+        # 打字机效果从空文本开始填充
+        bubble = self._create_chat_widget(msg, len(self.chat_messages), text="" if typing else message)
+        
+        # 使用打字机效果显示AI回复（仅当use_typing_effect为True时）
+        if typing:
+            typing_animation(bubble, message, delay=60, cursor="|", cursor_blink=True, chunk=4)
+        
+        # 保存消息记录
+        msg['frame'] = bubble
+        self.chat_messages.append(msg)
         
         # 滚动到底部
-        self.chat_scrollable_frame._parent_canvas.update_idletasks()
-        self.chat_scrollable_frame._parent_canvas.yview_moveto(1.0)
+        self._scroll_chat_to_bottom()
     
-
-    
-    def _recreate_tabs(self):
-        """重新创建选项卡以更新标题"""
+    def add_chat_history(self, messages):
+        """批量恢复历史聊天记录（不使用打字机效果），并在末尾添加历史记录分割线
+        
+        添加期间断开滚动回调，整批消息只触发一次滚动和一次气泡裁剪。
+        """
+        canvas = self.chat_scrollable_frame._parent_canvas
+        canvas.configure(yscrollcommand=self.chat_scrollable_frame._scrollbar.set)
         try:
-            # 保存当前选中的选项卡
-            current_tab = self.tabview.get()
-            
-            # 获取当前内容
-            hexagram_content = self.hexagram_text.get("1.0", tk.END)
-            result_content = self.result_text.get("1.0", tk.END)
-            chat_content = self.chat_display.get("1.0", tk.END)
-            
-            # 删除所有选项卡
-            for tab_name in [t("tab_hexagram"), t("tab_result"), t("tab_chat"), t("tab_history")]:
-                try:
-                    self.tabview.delete(tab_name)
-                except:
-                    pass
-            
-            # 重新创建选项卡
-            self.hexagram_tab = self.tabview.add(t("tab_hexagram"))
-            self.result_tab = self.tabview.add(t("tab_result"))
-            self.chat_tab = self.tabview.add(t("tab_chat"))
-            self.history_tab = self.tabview.add(t("tab_history"))
-            
-            # 重新创建内容（简化版本）
-            self._recreate_tab_contents(hexagram_content, result_content, chat_content)
-            
-            # 恢复选中的选项卡
-            try:
-                self.tabview.set(current_tab)
-            except:
-                self.tabview.set(t("tab_hexagram"))
-                
-        except Exception as e:
-            logger.error(f"重新创建选项卡时出错: {e}")
+            for msg in messages:
+                if 'message' in msg and 'is_user' in msg:
+                    self.add_chat_bubble(
+                        msg['message'],
+                        is_user=msg['is_user'],
+                        is_error=msg.get('is_error', False),
+                        use_typing_effect=False
+                    )
+            self.add_history_divider()
+        finally:
+            canvas.configure(yscrollcommand=self._on_chat_yscroll)
+        self._schedule_chat_clip()
     
-    def _update_tab_titles(self):
-        """更新选项卡标题而不重新创建内容"""
-        try:
-            # 获取当前选项卡的映射
-            current_tabs = list(self.tabview._tab_dict.keys())
-            new_titles = [t("tab_hexagram"), t("tab_result"), t("tab_chat"), t("tab_history")]
-            
-            # 如果标题已经是正确的，就不需要更新
-            if current_tabs == new_titles:
-                return
-                
-            # 保存当前选中的选项卡索引
-            current_index = 0
-            try:
-                current_tab = self.tabview.get()
-                if current_tab in current_tabs:
-                    current_index = current_tabs.index(current_tab)
-            except:
-                pass
-            
-            # 更新选项卡标题
-            for i, (old_title, new_title) in enumerate(zip(current_tabs, new_titles)):
-                if old_title != new_title and old_title in self.tabview._tab_dict:
-                    # 获取选项卡内容
-                    tab_frame = self.tabview._tab_dict[old_title]
-                    # 删除旧标题的选项卡
-                    del self.tabview._tab_dict[old_title]
-                    # 添加新标题的选项卡
-                    self.tabview._tab_dict[new_title] = tab_frame
-                    # 更新按钮文本
-                    if hasattr(self.tabview, '_segmented_button'):
-                        self.tabview._segmented_button.configure(values=list(self.tabview._tab_dict.keys()))
-            
-            # 恢复选中的选项卡
-            if current_index < len(new_titles):
-                try:
-                    self.tabview.set(new_titles[current_index])
-                except:
-                    self.tabview.set(new_titles[0])
-                    
-        except Exception as e:
-            logger.error(f"更新选项卡标题时出错: {e}")
+    def _create_chat_widget(self, msg, row, text=None):
+        """为一条消息记录创建组件并放到指定行（气泡裁剪后重新进入可见区域时也用此方法重建）"""
+        if msg.get('is_divider'):
+            return self._create_history_divider(row)
+        bubble = ChatBubbleCanvas(
+            self.chat_scrollable_frame,
+            msg['message'] if text is None else text,
+            is_user=msg['is_user'],
+            is_error=msg['is_error']
+        )
+        bubble.grid(row=row, column=0, sticky="ew", pady=(10, 5), padx=10)
+        return bubble
+    
+    def _scroll_chat_to_bottom(self):
+        """在空闲时滚动聊天区域到底部，连续添加多条消息时只计算一次布局"""
+        if self._chat_scroll_job is None:
+            self._chat_scroll_job = self.after_idle(self._do_scroll_chat_to_bottom)
+    
+    def _do_scroll_chat_to_bottom(self):
+        """完成布局计算后滚动到底部"""
+        self._chat_scroll_job = None
+        canvas = self.chat_scrollable_frame._parent_canvas
+        canvas.update_idletasks()
+        canvas.yview_moveto(1.0)
+    
+    def _on_chat_yscroll(self, first, last):
+        """聊天区域滚动时更新滚动条，并安排重新裁剪气泡"""
+        self.chat_scrollable_frame._scrollbar.set(first, last)
+        self._schedule_chat_clip()
+    
+    def _schedule_chat_clip(self, event=None):
+        """在空闲时裁剪聊天气泡，同一轮事件中的多次滚动只处理一次"""
+        if self._chat_clip_job is None and len(self.chat_messages) >= CHAT_CLIP_THRESHOLD:
+            self._chat_clip_job = self.after_idle(self._clip_chat_bubbles)
+    
+    def _release_clipped_rows(self):
+        """清除被隐藏气泡占位用的行高（删除气泡前调用）"""
+        for row, msg in enumerate(self.chat_messages):
+            if msg.get('clipped'):
+                self.chat_scrollable_frame.grid_rowconfigure(row, minsize=0)
     
-    def _recreate_tab_contents(self, hexagram_content, result_content, chat_content):
-        """重新创建选项卡内容"""
+    def _clip_chat_bubbles(self):
+        """只为可见区域附近的消息保留组件，其余消息的组件销毁，只保留消息记录
+        
+        被销毁的组件所在行设置minsize为原高度，滚动区域总高度和各气泡位置保持不变；
+        重新进入可见区域时按消息记录重建组件。
+        """
+        self._chat_clip_job = None
         try:
-            # 重新创建卦象选项卡内容
-            self._create_hexagram_tab_content()
-            if hexagram_content.strip():
-                self.hexagram_text.delete("1.0", tk.END)
-                self.hexagram_text.insert("1.0", hexagram_content)
-            
-            # 重新创建解读结果选项卡内容
-            self._create_result_tab_content()
-            if result_content.strip():
-                self.result_text.delete("1.0", tk.END)
-                self.result_text.insert("1.0", result_content)
-            
-            # 重新创建聊天选项卡内容
-            self._create_chat_tab_content()
-            # 聊天气泡会在_create_chat_tab_content中重新创建
+            frame = self.chat_scrollable_frame
+            total_height = frame.winfo_height()
+            if total_height <= 1:
+                return
             
-            # 重新创建历史记录选项卡内容
-            self._create_history_tab_content()
+            top, bottom = frame._parent_canvas.yview()
+            view_top = top * total_height - CHAT_CLIP_MARGIN
+            view_bottom = bottom * total_height + CHAT_CLIP_MARGIN
             
+            for row, msg in enumerate(self.chat_messages):
+                # grid_bbox按行高计算，隐藏的气泡仍以minsize占位
+                _, y, _, height = frame.grid_bbox(0, row)
+                visible = y + height >= view_top and y <= view_bottom
+                if visible and msg.get('clipped'):
+                    msg['frame'] = self._create_chat_widget(msg, row)
+                    frame.grid_rowconfigure(row, minsize=0)
+                    msg['clipped'] = False
+                elif not visible and not msg.get('clipped') and height > 0:
+                    frame.grid_rowconfigure(row, minsize=height)
+                    msg['frame'].destroy()
+                    msg['frame'] = None
+                    msg['clipped'] = True
         except Exception as e:
-            logger.error(f"重新创建选项卡内容时出错: {e}")
+            logger.error(f"裁剪聊天气泡时出错: {e}")
     
     def update_theme(self):
         """更新主题颜色"""
         try:
-            from config.ui_config import get_ui_settings
-            ui_settings = get_ui_settings()
-            colors = ui_settings['colors']
+            snapshot = self._get_theme_snapshot()
+            if snapshot == self._theme_snapshot:
+                logger.debug("NotebookFrame主题未变化，跳过更新")
+                return
+            self._theme_snapshot = snapshot
+            
+            # UI_SETTINGS即get_ui_settings()返回的同一个字典，常用颜色只取一次
+            colors = UI_SETTINGS['colors']
+            card_bg = colors['card_bg']
+            text_color = colors['text_color']
+            primary_color = colors['primary_color']
             
             # 更新frame背景色
-            self.configure(fg_color=colors['card_bg'])
+            self.configure(fg_color=card_bg)
             
             # 更新选项卡控件的颜色
             if hasattr(self, 'tabview'):
                 self.tabview.configure(
-                    fg_color=colors['card_bg'],
+                    fg_color=card_bg,
                     segmented_button_fg_color=colors['gray_2'],
-                    segmented_button_selected_color=colors['primary_color'],
+                    segmented_button_selected_color=primary_color,
                     segmented_button_selected_hover_color=colors['primary_alpha_20'],
                     segmented_button_unselected_color=colors['gray_2'],
                     segmented_button_unselected_hover_color=colors['gray_3'],
-                    text_color=colors['text_color'],
+                    text_color=text_color,
                     text_color_disabled=colors['secondary_text']
                 )
             
             # 更新卦象信息文本框 (标准tkinter组件)
             if hasattr(self, 'hexagram_text'):
                 self.hexagram_text.configure(
-                    bg=colors['card_bg'],
-                    fg=colors['text_color']
+                    bg=card_bg,
+                    fg=text_color
                 )
             
             # 更新结果显示文本框 (标准tkinter组件)
             if hasattr(self, 'result_text'):
                 self.result_text.configure(
-                    bg=colors['card_bg'],
-                    fg=colors['text_color']
+                    bg=card_bg,
+                    fg=text_color
                 )
                 # 重新配置文本标签样式
-                self.result_text.tag_configure('main_text', foreground=colors['text_color'])
-            self.result_text.tag_configure('explanation', foreground=colors['gray_5'])
-            self.result_text.tag_configure('aspect_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=colors['primary_color'])
-            self.result_text.tag_configure('conclusion_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=colors['danger_color'])
-            self.result_text.tag_configure('question', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=colors['text_color'])
-            self.result_text.tag_configure('hexagram', font=("Consolas", 13), foreground=colors['text_color'])
-            self.result_text.tag_configure('separator', foreground=colors['separator'])
-            self.result_text.tag_configure('error', foreground=colors['danger_color'], font=(UI_SETTINGS['font_family'], 12, 'bold'))
-            self.result_text.tag_configure('welcome', font=(UI_SETTINGS['font_family'], 14), foreground=colors['secondary_text'], justify='center')
-            self.result_text.tag_configure('reference_title', font=(UI_SETTINGS['font_family'], 14, 'bold'), foreground=colors['primary_color'])  # 参考文献标题样式
-            self.result_text.tag_configure('reference_text', foreground=colors['gray_5'], font=(UI_SETTINGS['font_family'], 12))  # 参考文献内容样式
+                self._configure_result_tags(colors)
             
             # 更新聊天滚动框架
             if hasattr(self, 'chat_scrollable_frame'):
                 self.chat_scrollable_frame.configure(
-                    fg_color=colors['card_bg'],
+                    fg_color=card_bg,
                     scrollbar_button_color=colors['gray_4'],
                     scrollbar_button_hover_color=colors['gray_5']
                 )
                 
-                # 重新创建所有聊天气泡以应用新主题
-                self.refresh_chat_bubbles()
+                # 只有气泡用到的颜色变化时才刷新聊天气泡（例如只改了滚动条颜色时不必刷新）
+                chat_theme_state = self._get_chat_theme_state()
+                if chat_theme_state != self._chat_theme_state:
+                    self._chat_theme_state = chat_theme_state
+                    self.refresh_chat_bubbles()
             
             # 更新聊天输入框 (customtkinter组件)
             if hasattr(self, 'chat_entry'):
                 self.chat_entry.configure(
-                    fg_color=colors['card_bg'],
-                    text_color=colors['text_color'],
+                    fg_color=card_bg,
+                    text_color=text_color,
                     placeholder_text_color=colors['secondary_text']
                 )
             
             # 更新发送按钮
             if hasattr(self, 'send_button'):
                 self.send_button.configure(
-                    fg_color=colors['primary_color'],
+                    fg_color=primary_color,
                     hover_color=colors['primary_alpha_20']
                 )
             
             # 更新历史记录列表 (customtkinter组件)
             if hasattr(self, 'history_listbox'):
                 self.history_listbox.configure(
-                    fg_color=colors['card_bg'],
-                    text_color=colors['text_color']
+                    fg_color=card_bg,
+                    text_color=text_color
                 )
             
             # 更新历史记录框架
@@ -1014,8 +1170,6 @@ class NotebookFrame(ctk.CTkFrame):
     def update_chat_model_list(self):
         """更新聊天模型列表"""
         try:
-            from config.settings import SUPPORTED_MODELS
-            
             # 获取内置模型（自定义模型功能已移除）
             all_models = list(SUPPORTED_MODELS)
             
@@ -1038,41 +1192,29 @@ class NotebookFrame(ctk.CTkFrame):
             logger.error(f"更新聊天模型列表时出错: {e}")
     
     def refresh_chat_bubbles(self):
-        """刷新所有聊天气泡以应用新主题"""
+        """刷新所有聊天气泡以应用新主题
+        
+        气泡和分割线原地重新着色，不销毁组件也不重新排版文本；只有字体改变的才重建。
+        已被裁剪（组件已销毁）的消息在重新进入可见区域时按新主题创建。
+        """
         try:
             if not hasattr(self, 'chat_messages') or not self.chat_messages:
                 return
             
-            # 保存所有消息数据
-            messages_data = []
-            for msg in self.chat_messages:
-                messages_data.append({
-                    'message': msg['message'],
-                    'is_user': msg['is_user'],
-                    'is_error': msg['is_error'],
-                    'is_divider': msg.get('is_divider', False)  # 添加分割线标志
-                })
-            
-            # 清除所有现有的消息框架
-            for msg in self.chat_messages:
-                if msg['frame'].winfo_exists():
-                    msg['frame'].destroy()
-            
-            # 重置消息列表
-            self.chat_messages = []
-            
-            # 重新创建所有消息气泡
-            for msg_data in messages_data:
-                if msg_data.get('is_divider', False):
-                    self.add_history_divider()
+            font_family = UI_SETTINGS['font_family']
+            rebuilt = 0
+            for row, msg in enumerate(self.chat_messages):
+                widget = msg.get('frame')
+                if widget is None or not widget.winfo_exists():
+                    continue
+                if widget._font[0] == font_family:
+                    widget.update_theme()
                 else:
-                    self.add_chat_bubble(
-                        msg_data['message'],
-                        is_user=msg_data['is_user'],
-                        is_error=msg_data['is_error']
-                    )
+                    widget.destroy()
+                    msg['frame'] = self._create_chat_widget(msg, row)
+                    rebuilt += 1
             
-            logger.debug(f"已刷新 {len(messages_data)} 个聊天气泡")
+            logger.debug(f"已刷新 {len(self.chat_messages)} 个聊天气泡，其中重建 {rebuilt} 个")
             
         except Exception as e:
             logger.error(f"刷新聊天气泡时出错: {e}")
@@ -1080,55 +1222,11 @@ class NotebookFrame(ctk.CTkFrame):
     def add_history_divider(self):
         """添加历史记录分割线"""
         try:
-            # 创建分割线容器
-            divider_frame = ctk.CTkFrame(
-                self.chat_scrollable_frame,
-                fg_color="transparent"
-            )
-            divider_frame.grid(row=len(self.chat_messages), column=0, sticky="ew", pady=10, padx=10)
-            divider_frame.grid_columnconfigure(0, weight=1)
-            
-            # 创建分割线
-            divider_container = ctk.CTkFrame(
-                divider_frame,
-                fg_color="transparent",
-                height=30
-            )
-            divider_container.grid(row=0, column=0, sticky="ew")
-            divider_container.grid_columnconfigure(0, weight=1)
-            divider_container.grid_columnconfigure(2, weight=1)
-            
-            # 左侧分割线
-            left_line = ctk.CTkFrame(
-                divider_container,
-                fg_color=UI_SETTINGS['colors']['separator'],
-                height=1
-            )
-            left_line.grid(row=0, column=0, sticky="ew", padx=(0, 10), pady=(15, 0))
-            
-            # 中间文字
-            divider_text = ctk.CTkLabel(
-                divider_container,
-                text="以上为历史记录",
-                font=ctk.CTkFont(
-                    family=UI_SETTINGS['font_family'],
-                    size=12
-                ),
-                text_color=UI_SETTINGS['colors']['secondary_text']
-            )
-            divider_text.grid(row=0, column=1, pady=(10, 0))
-            
-            # 右侧分割线
-            right_line = ctk.CTkFrame(
-                divider_container,
-                fg_color=UI_SETTINGS['colors']['separator'],
-                height=1
-            )
-            right_line.grid(row=0, column=2, sticky="ew", padx=(10, 0), pady=(15, 0))
+            divider = self._create_history_divider(len(self.chat_messages))
             
             # 保存分割线记录
             self.chat_messages.append({
-                'frame': divider_frame,
+                'frame': divider,
                 'message': "以上为历史记录",
                 'is_user': False,
                 'is_error': False,
@@ -1136,10 +1234,15 @@ class NotebookFrame(ctk.CTkFrame):
             })
             
             # 滚动到底部
-            self.chat_scrollable_frame._parent_canvas.update_idletasks()
-            self.chat_scrollable_frame._parent_canvas.yview_moveto(1.0)
+            self._scroll_chat_to_bottom()
             
             logger.debug("已添加历史记录分割线")
             
         except Exception as e:
-            logger.error(f"添加历史记录分割线时出错: {e}")
\ No newline at end of file
+            logger.error(f"添加历史记录分割线时出错: {e}")
+    
+    def _create_history_divider(self, row):
+        """创建历史记录分割线组件并放到指定行"""
+        divider = HistoryDividerCanvas(self.chat_scrollable_frame, "以上为历史记录")
+        divider.grid(row=row, column=0, sticky="ew", pady=10, padx=10)
+        return divider
@@ -31,6 +31,12 @@ class StatusFrame(ctk.CTkFrame):
         self.is_initializing = False
         self.original_bg_color = UI_SETTINGS['colors']['card_bg']
         
+        # 状态标签的两种字体只创建一次，每次更新状态时直接复用
+        self._status_fonts = {
+            'normal': ctk.CTkFont(family=UI_SETTINGS['font_family'], size=14, weight="bold"),
+            'highlight': ctk.CTkFont(family=UI_SETTINGS['font_family'], size=15, weight="bold"),
+        }
+        
         # 创建状态栏组件
         self.create_widgets()
     
@@ -55,11 +61,7 @@ class StatusFrame(ctk.CTkFrame):
         self.status_label = ctk.CTkLabel(
             self,
             textvariable=self.status_var,
-            font=ctk.CTkFont(
-                family=UI_SETTINGS['font_family'],
-                size=14,  # 增加字体大小
-                weight="bold"  # 加粗字体
-            ),
+            font=self._status_fonts['normal'],
             width=140,  # 进一步增加宽度
             anchor="w"
         )
@@ -105,11 +107,7 @@ class StatusFrame(ctk.CTkFrame):
             # 初始化时使用更显眼的样式
             self.status_label.configure(
                 text_color="#ffffff",  # 白色文字，更显眼
-                font=ctk.CTkFont(
-                    family=UI_SETTINGS['font_family'],
-                    size=15,  # 更大字体
-                    weight="bold"
-                )
+                font=self._status_fonts['highlight']  # 更大字体
             )
             # 改变背景色以突出显示
             self.configure(fg_color="#0078d4")  # 蓝色背景
@@ -119,11 +117,7 @@ class StatusFrame(ctk.CTkFrame):
             # 恢复正常样式
             self.status_label.configure(
                 text_color=UI_SETTINGS['colors']['text_color'],
-                font=ctk.CTkFont(
-                    family=UI_SETTINGS['font_family'],
-                    size=14,
-                    weight="bold"
-                )
+                font=self._status_fonts['normal']
             )
             # 恢复原背景色
             self.configure(fg_color=self.original_bg_color)
@@ -1,6 +1,7 @@
 # utils/animation.py
 # UI动画效果工具函数
 
+import time
 import tkinter as tk
 from typing import Callable, Any, Optional
 
@@ -11,6 +12,9 @@ from utils.logger import setup_logger
 # 设置日志记录器
 logger = setup_logger(__name__)
 
+# 打字机效果的刷新间隔（毫秒，约60FPS），每帧按实际经过的时间追加字符
+TYPING_FRAME_INTERVAL = 16
+
 
 def animate_widget_property(
     widget: tk.Widget,
@@ -432,6 +436,15 @@ def pulse_animation(
     current_repeat = [0]  # 使用列表存储当前重复次数，以便在闭包中修改
     
     def single_pulse():
+        # 控件不可见（如窗口最小化）时停止动画，避免后台持续重绘
+        try:
+            if not widget.winfo_viewable():
+                if callback:
+                    callback()
+                return
+        except tk.TclError:
+            return
+        
         # 从起始颜色到结束颜色
         animate_widget_property(
             widget, 
@@ -470,48 +483,70 @@ def typing_animation(
     callback: Optional[Callable] = None,
     cursor: str = "|",  # 光标字符
     cursor_blink: bool = True,  # 是否闪烁光标
-    auto_scroll: bool = True  # 是否自动滚动以保持最后一行可见
+    auto_scroll: bool = True,  # 是否自动滚动以保持最后一行可见
+    chunk: int = 1  # 每次显示的字符数
 ) -> None:
     """打字机效果动画
     
     Args:
         widget: 标签控件
         text: 要显示的文本
-        delay: 每个字符的延迟时间(毫秒)
+        delay: 每显示chunk个字符所用的时间(毫秒)
         callback: 动画完成后的回调函数
         cursor: 光标字符
         cursor_blink: 是否闪烁光标
         auto_scroll: 是否自动滚动以保持最后一行可见
+        chunk: 每delay毫秒显示的字符数
+    
+    以固定帧率刷新，每帧根据实际经过的时间一次追加多个字符，而不是每个字符安排一次after回调；
+    字符数未变化的帧不更新控件。
     """
     cursor_visible = [True]  # 使用列表以便在闭包中修改
+    scroll_state = {'target': None, 'pending': False}  # 滚动目标只查找一次；滚动请求合并到空闲时执行
+    
+    def find_scroll_target():
+        """向上查找父级滚动区域"""
+        parent = widget.winfo_parent()
+        parent_widget = widget._nametowidget(parent)
+        
+        # 向上查找父级，直到找到带有_parent_canvas属性的组件或CTkScrollableFrame
+        while parent_widget and not hasattr(parent_widget, '_parent_canvas'):
+            if not hasattr(parent_widget, 'winfo_parent') or not parent_widget.winfo_parent():
+                break
+            parent = parent_widget.winfo_parent()
+            parent_widget = widget._nametowidget(parent)
+        
+        # 如果找到了滚动画布，滚动它；否则尝试其他常见的滚动容器类型
+        if hasattr(parent_widget, '_parent_canvas'):
+            return parent_widget._parent_canvas, True
+        if hasattr(parent_widget, 'yview_moveto'):
+            return parent_widget, False
+        return None, False
+    
+    def do_scroll_to_bottom():
+        """完成布局计算后滚动到底部（同一轮事件中的多次请求只执行一次）"""
+        scroll_state['pending'] = False
+        try:
+            target, needs_layout = scroll_state['target']
+            if target is None or not target.winfo_exists():
+                return
+            if needs_layout:
+                target.update_idletasks()
+            target.yview_moveto(1.0)
+        except Exception:
+            # 如果出现任何错误，忽略并继续
+            pass
     
     def scroll_to_bottom():
         """滚动到底部，确保最后一行可见"""
-        if not auto_scroll:
+        if not auto_scroll or scroll_state['pending']:
             return
             
-        # 尝试获取父级滚动区域
         try:
-            # 查找父级滚动画布
-            parent = widget.winfo_parent()
-            parent_widget = widget._nametowidget(parent)
-            
-            # 向上查找父级，直到找到带有_parent_canvas属性的组件或CTkScrollableFrame
-            while parent_widget and not hasattr(parent_widget, '_parent_canvas'):
-                if not hasattr(parent_widget, 'winfo_parent') or not parent_widget.winfo_parent():
-                    break
-                parent = parent_widget.winfo_parent()
-                parent_widget = widget._nametowidget(parent)
-            
-            # 如果找到了滚动画布，滚动到底部
-            if hasattr(parent_widget, '_parent_canvas'):
-                parent_widget._parent_canvas.update_idletasks()
-                parent_widget._parent_canvas.yview_moveto(1.0)
-            
-            # 尝试其他常见的滚动容器类型
-            elif hasattr(parent_widget, 'yview_moveto'):
-                parent_widget.yview_moveto(1.0)
-                
+            if scroll_state['target'] is None:
+                scroll_state['target'] = find_scroll_target()
+            scroll_state['pending'] = True
+            widget.after_idle(do_scroll_to_bottom)
         except Exception:
             # 如果出现任何错误，忽略并继续
             pass
@@ -535,25 +570,33 @@ def typing_animation(
                 
             widget.after(500, blink_cursor)  # 光标每500毫秒闪烁一次
     
-    def type_text(index=0):
+    start_time = time.monotonic()
+    chars_per_ms = chunk / max(delay, 1)
+    
+    def type_text(shown=-1):
         if not hasattr(widget, 'winfo_exists') or not widget.winfo_exists():
             return
             
         widget._typing_active = True  # 标记打字动画正在进行
-        widget._current_index = index  # 保存当前索引
+        
+        # 按经过的时间计算本帧应显示到的位置
+        elapsed_ms = (time.monotonic() - start_time) * 1000
+        index = int(elapsed_ms * chars_per_ms)
         
         if index <= len(text):
-            # 使用configure而不是config，以兼容customtkinter控件
-            try:
-                widget.configure(text=text[:index] + (cursor if cursor_visible[0] else ""))
-            except AttributeError:
-                # 兼容标准tkinter控件
-                widget.config(text=text[:index] + (cursor if cursor_visible[0] else ""))
-            
-            # 每次更新文本后滚动到底部
-            scroll_to_bottom()
+            if index != shown:
+                widget._current_index = index  # 保存当前索引
+                # 使用configure而不是config，以兼容customtkinter控件
+                try:
+                    widget.configure(text=text[:index] + (cursor if cursor_visible[0] else ""))
+                except AttributeError:
+                    # 兼容标准tkinter控件
+                    widget.config(text=text[:index] + (cursor if cursor_visible[0] else ""))
+                
+                # 每次更新文本后滚动到底部
+                scroll_to_bottom()
                 
-            widget.after(delay, lambda: type_text(index + 1))
+            widget.after(TYPING_FRAME_INTERVAL, type_text, index)
         else:
             # 打字完成后，移除光标
             try:
@@ -18,6 +18,8 @@ class ConfigManager:
     def __init__(self, config_file: str = "app_config.json"):
         self.config_file = config_file
         self.config_data: Dict[str, Any] = {}
+        # 配置是否有未保存的修改
+        self._dirty = False
         self.load_config()
     
     def load_config(self) -> None:
@@ -33,12 +35,22 @@ class ConfigManager:
         except Exception as e:
             logger.error(f"加载配置文件失败: {str(e)}")
             self.config_data = {}
+        self._dirty = False
     
     def save_config(self) -> bool:
-        """保存配置文件"""
+        """保存配置文件
+        
+        没有未保存的修改时直接返回；先写入临时文件再原子替换，
+        避免写入中途退出导致配置文件损坏。
+        """
+        if not self._dirty:
+            return True
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            temp_file = f"{self.config_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config_data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.config_file)
+            self._dirty = False
             logger.info(f"成功保存配置文件: {self.config_file}")
             return True
         except Exception as e:
@@ -50,8 +62,13 @@ class ConfigManager:
         return self.config_data.get(key, default)
     
     def set(self, key: str, value: Any) -> None:
-        """设置配置值"""
+        """设置配置值（值未变化时不标记为待保存）"""
+        # 列表/字典可能是调用方取出后就地修改再传回的同一对象，比较总是相等，始终标记为待保存
+        if (not isinstance(value, (list, dict))
+                and key in self.config_data and self.config_data[key] == value):
+            return
         self.config_data[key] = value
+        self._dirty = True
     
     def get_theme_mode(self) -> str:
         """获取主题模式"""
@@ -85,6 +102,14 @@ class ConfigManager:
     def set_last_model(self, model: str) -> None:
         """设置上次使用的模型"""
         self.set('last_model', model)
+    
+    def get_last_export_dir(self) -> Optional[str]:
+        """获取上次导出文件所在的目录"""
+        return self.get('last_export_dir')
+    
+    def set_last_export_dir(self, directory: str) -> None:
+        """设置上次导出文件所在的目录"""
+        self.set('last_export_dir', directory)
 
 # 全局配置管理器实例
 config_manager = ConfigManager()
\ No newline at end of file
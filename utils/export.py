@@ -3,7 +3,7 @@
 
 import datetime
 import os
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 # 导入配置
 from config.constants import APP_NAME, APP_VERSION
@@ -13,6 +13,9 @@ from utils.logger import setup_logger, log_exception
 # 设置日志记录器
 logger = setup_logger(__name__)
 
+# 文本导出的写缓冲区大小（1 MiB）
+EXPORT_BUFFER_SIZE = 1 << 20
+
 
 def export_to_pdf(
     file_path: str,
@@ -290,7 +293,8 @@ def export_to_text(
         Tuple[bool, str]: (成功标志, 成功/错误消息)
     """
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
+        # 使用较大的写缓冲区，长文本分析结果分段写入时合并为少量系统调用
+        with open(file_path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE) as f:
             # 写入标题
             f.write(f"{title}\n\n")
             
@@ -348,7 +352,8 @@ def export_analysis_results(
     hexagram_info: str,
     analysis_results: List[Dict[str, str]],
     conclusion: str,
-    language: str = "zh_CN"
+    language: str = "zh_CN",
+    progress_callback: Optional[Callable[[float], None]] = None
 ) -> Tuple[bool, str]:
     """根据文件类型导出分析结果
     
@@ -360,6 +365,7 @@ def export_analysis_results(
         analysis_results: 分析结果列表
         conclusion: 总结论
         language: 语言代码
+        progress_callback: 进度回调，参数为0~1的进度值；在调用线程中执行
         
     Returns:
         Tuple[bool, str]: (成功标志, 成功/错误消息)
@@ -368,14 +374,21 @@ def export_analysis_results(
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     
+    if progress_callback:
+        progress_callback(0.1)
+    
     # 根据文件类型调用相应的导出函数
     if ext == FILE_TYPES["PDF"]["extension"]:
-        return export_to_pdf(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
+        result = export_to_pdf(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
     elif ext == FILE_TYPES["WORD"]["extension"]:
-        return export_to_word(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
+        result = export_to_word(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
     elif ext == FILE_TYPES["TEXT"]["extension"]:
-        return export_to_text(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
+        result = export_to_text(file_path, title, question, hexagram_info, analysis_results, conclusion, language)
     else:
         error_msg = f"不支持的文件类型: {ext}"
         logger.error(error_msg)
-        return False, error_msg
\ No newline at end of file
+        result = (False, error_msg)
+    
+    if progress_callback:
+        progress_callback(1.0)
+    return result
\ No newline at end of file
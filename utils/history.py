@@ -7,9 +7,10 @@
 
 import json
 import os
+import textwrap
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any, Tuple
 
 from utils.logger import setup_logger
 
@@ -36,6 +37,31 @@ class HistoryRecord:
         if self.chat_messages is None:
             self.chat_messages = []
     
+    @property
+    def search_text(self) -> str:
+        """小写的可搜索文本（问题、分析结果和标签），首次访问时计算并缓存
+        
+        各部分以\\x00分隔，避免关键词跨字段匹配；修改这些字段后需调用invalidate_search_text。
+        """
+        search_blob = self.__dict__.get('_search_blob')
+        if search_blob is None:
+            search_blob = "\x00".join([self.question, self.analysis_result, *self.tags]).lower()
+            self._search_blob = search_blob
+        return search_blob
+    
+    def invalidate_search_text(self) -> None:
+        """可搜索字段变化后清除缓存"""
+        self.__dict__.pop('_search_blob', None)
+    
+    @property
+    def norm_id(self) -> str:
+        """规范化的记录ID（字符串、去掉下划线），用作Treeview标签和查找键，首次访问时计算并缓存"""
+        norm_id = self.__dict__.get('_norm_id')
+        if norm_id is None:
+            norm_id = str(self.id).replace('_', '')
+            self._norm_id = norm_id
+        return norm_id
+    
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return asdict(self)
@@ -51,8 +77,25 @@ class HistoryManager:
     def __init__(self, history_file: str = "data/history.json"):
         self.history_file = history_file
         self.records: List[HistoryRecord] = []
+        # (问题, 起卦方式, 模型) -> 最新的匹配记录
+        self._record_index: Dict[Tuple[str, str, str], HistoryRecord] = {}
         self.load_history()
     
+    @staticmethod
+    def _index_key(record: HistoryRecord) -> Tuple[str, str, str]:
+        """记录索引键"""
+        return (record.question, record.divination_method, record.model)
+    
+    def _rebuild_index(self) -> None:
+        """重建记录索引，记录按新到旧排列，保留每个键最靠前的记录"""
+        self._record_index = {}
+        for record in self.records:
+            self._record_index.setdefault(self._index_key(record), record)
+    
+    def find_record(self, question: str, divination_method: str, model: str) -> Optional[HistoryRecord]:
+        """按问题、起卦方式和模型查找最新的记录"""
+        return self._record_index.get((question, divination_method, model))
+    
     def load_history(self) -> None:
         """加载历史记录"""
         try:
@@ -67,6 +110,7 @@ class HistoryManager:
         except Exception as e:
             logger.error(f"加载历史记录失败: {e}")
             self.records = []
+        self._rebuild_index()
     
     def save_history(self) -> bool:
         """保存历史记录"""
@@ -102,6 +146,7 @@ class HistoryManager:
         )
         
         self.records.insert(0, record)  # 新记录插入到开头
+        self._record_index[self._index_key(record)] = record
         self.save_history()
         logger.info(f"添加新历史记录: {record_id}")
         return record_id
@@ -119,6 +164,11 @@ class HistoryManager:
                 return record
         return None
     
+    @staticmethod
+    def matches_keyword(record: HistoryRecord, keyword: str) -> bool:
+        """判断记录是否包含关键词（keyword需已转为小写）"""
+        return keyword in record.search_text
+    
     def search_records(self, keyword: str = "", divination_method: str = "", 
                       start_date: str = "", end_date: str = "") -> List[HistoryRecord]:
         """搜索历史记录"""
@@ -127,10 +177,7 @@ class HistoryManager:
         # 关键词搜索
         if keyword:
             keyword = keyword.lower()
-            results = [r for r in results if 
-                      keyword in r.question.lower() or 
-                      keyword in r.analysis_result.lower() or
-                      any(keyword in tag.lower() for tag in r.tags)]
+            results = [r for r in results if self.matches_keyword(r, keyword)]
         
         # 起卦方式过滤
         if divination_method:
@@ -149,6 +196,8 @@ class HistoryManager:
         for i, record in enumerate(self.records):
             if record.id == record_id:
                 del self.records[i]
+                if self._record_index.get(self._index_key(record)) is record:
+                    self._rebuild_index()
                 self.save_history()
                 logger.info(f"删除历史记录: {record_id}")
                 return True
@@ -158,6 +207,7 @@ class HistoryManager:
         """清空所有历史记录"""
         try:
             self.records = []
+            self._record_index = {}
             self.save_history()
             logger.info("已清空所有历史记录")
             return True
@@ -170,6 +220,7 @@ class HistoryManager:
         record = self.get_record_by_id(record_id)
         if record:
             record.tags = tags
+            record.invalidate_search_text()
             self.save_history()
             logger.info(f"更新记录标签: {record_id}")
             return True
@@ -210,23 +261,37 @@ class HistoryManager:
             "recent_activity": len(recent_records)
         }
     
-    def export_records(self, records: List[HistoryRecord], format: str = "json") -> str:
-        """导出记录"""
+    def iter_export(self, records: List[HistoryRecord], format: str = "json") -> Iterator[str]:
+        """逐条生成导出内容片段，便于直接写入文件而不在内存中拼出完整内容"""
         if format == "json":
-            return json.dumps([record.to_dict() for record in records], 
-                            ensure_ascii=False, indent=2)
+            if not records:
+                yield "[]"
+                return
+            yield "[\n"
+            for i, record in enumerate(records):
+                record_json = json.dumps(record.to_dict(), ensure_ascii=False, indent=2)
+                # 与整体json.dumps(indent=2)的缩进保持一致
+                yield ("" if i == 0 else ",\n") + textwrap.indent(record_json, "  ")
+            yield "\n]"
         elif format == "csv":
             import csv
             import io
             output = io.StringIO()
             writer = csv.writer(output)
             
+            def flush_row(row):
+                writer.writerow(row)
+                chunk = output.getvalue()
+                output.seek(0)
+                output.truncate()
+                return chunk
+            
             # 写入标题行
-            writer.writerow(["ID", "时间", "问题", "起卦方式", "模型", "卦象信息", "分析结果", "标签"])
+            yield flush_row(["ID", "时间", "问题", "起卦方式", "模型", "卦象信息", "分析结果", "标签"])
             
             # 写入数据行
             for record in records:
-                writer.writerow([
+                yield flush_row([
                     record.id,
                     record.timestamp,
                     record.question,
@@ -236,10 +301,12 @@ class HistoryManager:
                     record.analysis_result,
                     ",".join(record.tags)
                 ])
-            
-            return output.getvalue()
         else:
             raise ValueError(f"不支持的导出格式: {format}")
+    
+    def export_records(self, records: List[HistoryRecord], format: str = "json") -> str:
+        """导出记录"""
+        return "".join(self.iter_export(records, format))
 
 # 全局历史记录管理器实例
 history_manager = HistoryManager()
\ No newline at end of file
@@ -323,6 +323,9 @@ class IOSEntry(tk.Frame, ThemeableWidget):
         self.is_focused = False
         self.showing_placeholder = True
         
+        # 上次应用的主题颜色(背景, 文本, 占位符)，颜色未变化时update_theme不重绘
+        self._theme_state = None
+        
         # 创建画布
         self.canvas = tk.Canvas(
             self,
@@ -333,7 +336,7 @@ class IOSEntry(tk.Frame, ThemeableWidget):
         )
         self.canvas.pack()
         
-        # 创建输入框
+        # 创建输入框（不绑定textvariable，避免每次按键触发变量追踪，值在需要时通过get()读取）
         self.entry = tk.Entry(
             self.canvas,
             font=(self.font_family, self.font_size),
@@ -444,21 +447,27 @@ class IOSEntry(tk.Frame, ThemeableWidget):
     def update_theme(self):
         """更新主题颜色"""
         ThemeableWidget.update_theme(self)
-        # 更新背景色
         new_bg_color = self.get_color("card_bg", "#F2F2F7")
+        new_text_color = self.get_color("text_color", "#000000")
+        new_placeholder_color = self.get_color("gray_3", "#8E8E93")
+        
+        theme_state = (new_bg_color, new_text_color, new_placeholder_color)
+        if theme_state == self._theme_state:
+            return
+        self._theme_state = theme_state
+        
+        # 更新背景色
         self.bg_color = new_bg_color
         self.config(bg=new_bg_color)
         self.canvas.config(bg=new_bg_color)
         self.entry.config(bg=new_bg_color)
         
         # 更新文本颜色
-        new_text_color = self.get_color("text_color", "#000000")
         self.text_color = new_text_color
         if not self.showing_placeholder:
             self.entry.config(fg=new_text_color)
         
         # 更新占位符颜色
-        new_placeholder_color = self.get_color("gray_3", "#8E8E93")
         self.placeholder_color = new_placeholder_color
         if self.showing_placeholder:
             self.entry.config(fg=new_placeholder_color)